@@ -14,13 +14,78 @@ class Settings(BaseSettings):
     USE_REF: bool = False
     REF_ID: str = 'T7B3IMWS'
 
-    USE_RANDOM_DELAY_IN_RUN: bool = True
-    RANDOM_DELAY_IN_RUN: list[int] = [5, 60]
-
     PROXY_TYPE: str = 'http'
 
     USE_PROXY_FROM_FILE: bool = True
     MAX_RETRIES: int = 2
+    RETRY_BASE_DELAY: float = 2
+    RETRY_MAX_DELAY: float = 30
+    RETRY_BUDGET_RATIO: float = 0.2
+    RETRY_BUDGET_MIN_PER_SECOND: float = 1
+    RETRY_BUDGET_CAP: float = 50
+    CIRCUIT_FAILURE_THRESHOLD: int = 20
+    CIRCUIT_RESET_TIMEOUT: int = 60
+
+    MAX_ACTIVE_SESSIONS: int = 50
+    SCHEDULER_STATS_INTERVAL: int = 300
+    CYCLE_INTERVAL: int = 1800
+    SPREAD_SESSIONS: bool = True
+    ADMISSION_RATE: float = 2
+    ADMISSION_MIN_RATE: float = 0.2
+    ADMISSION_MAX_ERROR_RATE: float = 0.2
+    ADMISSION_MAX_LATENCY: float = 5
+    ADMISSION_WINDOW: int = 30
+    SHUTDOWN_TIMEOUT: int = 20
+    SESSIONS_RELOAD_INTERVAL: int = 30
+    WORKERS: int = 1
+    WORKER_RESTART_DELAY: int = 5
+
+    CLUSTER_ENABLED: bool = False
+    NODE_ID: str = ''
+    LEASE_DB_PATH: str = 'sessions/leases.db'
+    LEASE_TTL: int = 60
+    LEASE_RENEW_INTERVAL: int = 15
+    HASH_RING_VNODES: int = 64
+
+    ADAPTIVE_SCHEDULING: bool = True
+    MIN_CYCLE_INTERVAL: int = 300
+    MAX_CYCLE_INTERVAL: int = 14400
+    COLLECT_THRESHOLD: float = 0.001
+    ACCRUAL_RATE_SMOOTHING: float = 0.3
+
+    REQUEST_TIMEOUT: float = 20
+    ENDPOINT_TIMEOUTS: dict[str, float] = {'/jwt/token': 30}
+    TG_CONNECT_TIMEOUT: float = 30
+    TG_INVOKE_TIMEOUT: float = 30
+    CYCLE_TIMEOUT: float = 300
+
+    TG_MAX_CONNECTED: int = 10
+    TG_CLIENT_WARM_TTL: int = 60
+
+    USE_AUTH_CACHE: bool = True
+    AUTH_CACHE_PEER_TTL: int = 604800
+
+    TOKEN_REFRESH_CONCURRENCY: int = 5
+    TOKEN_REFRESH_LEAD_TIME: int = 120
+    TOKEN_REFRESH_SPREAD: int = 180
+    TOKEN_WAIT_DELAY: int = 30
+
+    HTTP_POOL_MAX_CLIENTS: int = 20
+
+    PROXY_HEALTH_TTL: int = 600
+    PROXY_FAILED_TTL: int = 60
+    PROXY_CHECK_CONCURRENCY: int = 50
+    MAX_REQUESTS_PER_PROXY: int = 10
+
+    API_RATE_LIMIT: float = 5
+    API_RATE_BURST: int = 10
+    RATE_LIMITED_HOSTS: list[str] = ['back.lumcity.app']
+
+    UPGRADES_CACHE_TTL: int = 3600
+
+    ACCOUNTS_FLUSH_DELAY: float = 1.0
+    ACCOUNTS_BACKEND: str = 'json'
+    SQLITE_PATH: str = 'sessions/accounts.db'
 
 
 settings = Settings()
@@ -0,0 +1,68 @@
+from time import time
+
+from bot.config import settings
+
+
+class AccrualState:
+    __slots__ = ('balance', 'sampled_at', 'rate')
+
+    def __init__(self, balance: float, sampled_at: float, rate: float | None = None):
+        self.balance = balance
+        self.sampled_at = sampled_at
+        self.rate = rate
+
+    def to_dict(self) -> dict:
+        return {'balance': self.balance, 'sampled_at': self.sampled_at, 'rate': self.rate}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AccrualState':
+        return cls(data['balance'], data['sampled_at'], data.get('rate'))
+
+
+class AccrualTracker:
+    def __init__(self, smoothing: float | None = None):
+        self.smoothing = settings.ACCRUAL_RATE_SMOOTHING if smoothing is None else smoothing
+        self._states: dict[str, AccrualState] = {}
+
+    def record(self, session_name: str, balance: float, at: float | None = None) -> None:
+        """Records the miner balance and updates the smoothed mining rate"""
+        at = time() if at is None else at
+        state = self._states.get(session_name)
+        if state is None:
+            self._states[session_name] = AccrualState(balance, at)
+            return
+
+        elapsed = at - state.sampled_at
+        # A lower balance means it was collected outside of this process, so only the baseline moves
+        if elapsed >= 1 and balance >= state.balance:
+            sample = (balance - state.balance) / elapsed
+            state.rate = sample if state.rate is None else self.smoothing * sample + (1 - self.smoothing) * state.rate
+        state.balance = balance
+        state.sampled_at = at
+
+    def reset(self, session_name: str, at: float | None = None, keep_rate: bool = True) -> None:
+        """Moves the baseline to an empty miner after collect, forgetting the rate after an upgrade"""
+        state = self._states.get(session_name)
+        rate = state.rate if state is not None and keep_rate else None
+        self._states[session_name] = AccrualState(0.0, time() if at is None else at, rate)
+
+    def time_until(self, session_name: str, target: float) -> float | None:
+        """Estimated seconds until the miner balance reaches the target, None while the rate is unknown"""
+        state = self._states.get(session_name)
+        if state is None or not state.rate or state.rate <= 0:
+            return None
+        accrued = state.balance + state.rate * (time() - state.sampled_at)
+        return max((target - accrued) / state.rate, 0.0)
+
+    def get_state(self, session_name: str) -> dict | None:
+        state = self._states.get(session_name)
+        return state.to_dict() if state is not None else None
+
+    def set_state(self, session_name: str, data: dict) -> None:
+        self._states[session_name] = AccrualState.from_dict(data)
+
+    def remove(self, session_name: str) -> None:
+        self._states.pop(session_name, None)
+
+
+accrual_tracker = AccrualTracker()
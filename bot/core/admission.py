@@ -0,0 +1,61 @@
+import asyncio
+from collections import deque
+from time import monotonic
+
+from bot.config import settings
+from bot.utils import logger
+
+
+class AdmissionController:
+    def __init__(self):
+        self.rate: float | None = None
+        self._samples: deque[tuple[float, bool, float]] = deque()
+        self._adjusted_at = 0.0
+        self._next_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ADMISSION_RATE > 0
+
+    def observe(self, ok: bool, latency: float) -> None:
+        """Records the outcome of a Telegram or API call"""
+        if self.enabled:
+            self._samples.append((monotonic(), ok, latency))
+
+    def _adjust(self) -> None:
+        now = monotonic()
+        if self.rate is None:
+            self.rate = settings.ADMISSION_RATE
+        if now - self._adjusted_at < 1:
+            return
+        self._adjusted_at = now
+
+        while self._samples and self._samples[0][0] < now - settings.ADMISSION_WINDOW:
+            self._samples.popleft()
+        if len(self._samples) < 10:
+            return
+
+        error_rate = sum(not ok for _, ok, _ in self._samples) / len(self._samples)
+        latency = sum(latency for _, _, latency in self._samples) / len(self._samples)
+        # Multiplicative decrease on trouble, slow recovery up to the configured rate
+        if error_rate > settings.ADMISSION_MAX_ERROR_RATE or latency > settings.ADMISSION_MAX_LATENCY:
+            rate = max(self.rate / 2, settings.ADMISSION_MIN_RATE)
+        else:
+            rate = min(self.rate * 1.2, settings.ADMISSION_RATE)
+
+        if rate < self.rate:
+            logger.warning(f"Admission | slowing down to {rate:.2f} sessions/s | errors: {error_rate:.0%} | "
+                           f"latency: {latency * 1000:.0f} ms")
+        elif rate > self.rate and rate == settings.ADMISSION_RATE:
+            logger.info(f"Admission | back to {rate:.2f} sessions/s")
+        self.rate = rate
+
+    async def wait(self) -> None:
+        self._adjust()
+        delay = self._next_at - monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_at = monotonic() + 1 / self.rate
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,82 @@
+from time import time
+
+from bot.config import settings
+from bot.utils.file_manager import get_state_store
+
+
+class AuthCache:
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or get_state_store()
+
+    def _load(self, session_name: str) -> dict:
+        if not settings.USE_AUTH_CACHE:
+            return {}
+        return self.store.load_state(session_name).get('auth') or {}
+
+    def _update(self, session_name: str, **fields) -> None:
+        if not settings.USE_AUTH_CACHE:
+            return
+        state = self.store.load_state(session_name)
+        state['auth'] = {**(state.get('auth') or {}), **fields}
+        self.store.save_state(session_name, state)
+
+    def get_identity(self, session_name: str) -> dict | None:
+        return self._load(session_name).get('identity')
+
+    def save_identity(self, session_name: str, user_id: int, first_name: str, last_name: str, username: str) -> None:
+        self._update(session_name, identity={
+            'user_id': user_id,
+            'first_name': first_name,
+            'last_name': last_name,
+            'username': username
+        })
+
+    def get_peer(self, session_name: str):
+        peer = self._load(session_name).get('peer')
+        if not peer or time() - peer.get('saved_at', 0) >= settings.AUTH_CACHE_PEER_TTL:
+            return None
+
+        from pyrogram.raw.types import InputPeerUser
+
+        return InputPeerUser(user_id=peer['user_id'], access_hash=peer['access_hash'])
+
+    def save_peer(self, session_name: str, peer) -> None:
+        user_id = getattr(peer, 'user_id', None)
+        access_hash = getattr(peer, 'access_hash', None)
+        if user_id is None or access_hash is None:
+            return
+        self._update(session_name, peer={'user_id': user_id, 'access_hash': access_hash, 'saved_at': time()})
+
+    def get_token(self, session_name: str) -> tuple[str, float, int] | None:
+        token = self._load(session_name).get('token')
+        if not token or time() - token['created_time'] >= token['live_time']:
+            return None
+        return token['access_token'], token['created_time'], token['live_time']
+
+    def save_token(self, session_name: str, access_token: str, created_time: float, live_time: int) -> None:
+        self._update(session_name, token={
+            'access_token': access_token,
+            'created_time': created_time,
+            'live_time': live_time
+        })
+
+    def invalidate_token(self, session_name: str) -> None:
+        self._update(session_name, token=None)
+
+    def get_pickaxe_level(self, session_name: str) -> int | None:
+        # Game progress rather than credentials, so it is kept regardless of USE_AUTH_CACHE
+        return self.store.load_state(session_name).get('pickaxe_level')
+
+    def save_pickaxe_level(self, session_name: str, level: int | None) -> None:
+        state = self.store.load_state(session_name)
+        if state.get('pickaxe_level') == level:
+            return
+        state['pickaxe_level'] = level
+        self.store.save_state(session_name, state)
+
+
+auth_cache = AuthCache()
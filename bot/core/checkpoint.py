@@ -0,0 +1,46 @@
+from time import time
+
+from bot.core.accrual import accrual_tracker
+from bot.utils.file_manager import get_state_store
+
+
+class SessionCheckpoint:
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or get_state_store()
+
+    def save(self, scheduler) -> int:
+        """Saves the next run time and the accrual estimate of every scheduled session"""
+        store = self.store
+        due_times = scheduler.due_times()
+        saved_at = time()
+        for session_name in scheduler.sessions:
+            state = store.load_state(session_name)
+            state['checkpoint'] = {
+                'next_run_at': due_times.get(session_name),
+                'accrual': accrual_tracker.get_state(session_name),
+                'saved_at': saved_at
+            }
+            store.save_state(session_name, state)
+        store.flush()
+        return len(scheduler.sessions)
+
+    def restore(self, session_name: str) -> float | None:
+        """Restores the accrual estimate, returns the delay left until the next run or None to schedule afresh"""
+        checkpoint = self.store.load_state(session_name).get('checkpoint')
+        if not checkpoint:
+            return None
+
+        if checkpoint.get('accrual'):
+            accrual_tracker.set_state(session_name, checkpoint['accrual'])
+
+        next_run_at = checkpoint.get('next_run_at')
+        if next_run_at is None or next_run_at <= time():
+            return None
+        return next_run_at - time()
+
+
+session_checkpoint = SessionCheckpoint()
@@ -0,0 +1,132 @@
+import asyncio
+import bisect
+import hashlib
+import socket
+import sqlite3
+from time import time
+from typing import Callable, Iterable
+
+from bot.config import settings
+from bot.utils import logger
+
+
+def get_node_id() -> str:
+    return settings.NODE_ID or socket.gethostname()
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str], vnodes: int | None = None):
+        vnodes = vnodes or settings.HASH_RING_VNODES
+        points = sorted((_hash(f"{node}#{index}"), node) for node in nodes for index in range(vnodes))
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, session_name: str) -> str | None:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(session_name)) % len(self._keys)
+        return self._nodes[index]
+
+
+class LeaseCoordinator:
+    def __init__(self, session_names: Iterable[str], node_id: str | None = None, path: str | None = None):
+        self.node_id = node_id or get_node_id()
+        self.path = path or settings.LEASE_DB_PATH
+        self.sessions = set(session_names)
+        self.held: set[str] = set()
+        self.renewed_at = 0.0
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                session_name TEXT PRIMARY KEY,
+                node_id TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    @property
+    def expired(self) -> bool:
+        return time() - self.renewed_at >= settings.LEASE_TTL
+
+    def sync(self, busy: set[str] = frozenset()) -> tuple[set[str], set[str]]:
+        """Heartbeats, renews and claims leases of this node's ring slice; returns (acquired, to stop)"""
+        now = time()
+        expires_at = now + settings.LEASE_TTL
+        conn = self._conn
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO nodes (node_id, heartbeat_at) VALUES (?, ?)", (self.node_id, now))
+            conn.execute("DELETE FROM nodes WHERE heartbeat_at < ?", (now - settings.LEASE_TTL * 10,))
+            nodes = [node for node, in conn.execute("SELECT node_id FROM nodes WHERE heartbeat_at >= ?",
+                                                    (now - settings.LEASE_TTL,))]
+            ring = HashRing(nodes)
+            desired = {name for name in self.sessions if ring.owner(name) == self.node_id}
+
+            # Leases of sessions still finishing a cycle are kept until the cycle is over
+            release = [(name, self.node_id) for name in self.held - desired - busy]
+            conn.executemany("DELETE FROM leases WHERE session_name = ? AND node_id = ?", release)
+            conn.execute("UPDATE leases SET expires_at = ? WHERE node_id = ?", (expires_at, self.node_id))
+            conn.executemany(
+                "INSERT INTO leases (session_name, node_id, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_name) DO UPDATE SET node_id = excluded.node_id, expires_at = excluded.expires_at "
+                "WHERE leases.node_id = excluded.node_id OR leases.expires_at < ?",
+                [(name, self.node_id, expires_at, now) for name in desired - self.held]
+            )
+            held = {name for name, in conn.execute("SELECT session_name FROM leases WHERE node_id = ?",
+                                                   (self.node_id,))}
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        previous, self.held = self.held, held
+        self.renewed_at = now
+        acquired = (held & desired) - previous
+        to_stop = (previous - held) | (held - desired)
+        if acquired or previous - held:
+            logger.info(f"Cluster | node {self.node_id} | nodes: {len(nodes)} | acquired: {len(acquired)} | "
+                        f"released: {len(previous - held)} | held: {len(held)}/{len(self.sessions)}")
+        return acquired, to_stop
+
+    def release_all(self) -> None:
+        self._conn.execute("DELETE FROM leases WHERE node_id = ?", (self.node_id,))
+        self._conn.execute("DELETE FROM nodes WHERE node_id = ?", (self.node_id,))
+        self.held = set()
+
+    async def run(self, busy: Callable[[], set[str]], on_acquire: Callable[[str], None],
+                  on_release: Callable[[str], None]) -> None:
+        while True:
+            await asyncio.sleep(settings.LEASE_RENEW_INTERVAL)
+            try:
+                acquired, to_stop = self.sync(busy())
+            except sqlite3.Error as error:
+                logger.warning(f"Cluster | Can't renew leases: {error}")
+                if self.expired:
+                    # Other nodes may already own these sessions, stop before they run twice
+                    to_stop, acquired = set(self.held), set()
+                    self.held = set()
+                    logger.error(f"Cluster | Leases expired, stopping {len(to_stop)} sessions")
+                else:
+                    continue
+
+            for session_name in to_stop:
+                on_release(session_name)
+            for session_name in acquired:
+                on_acquire(session_name)
+
+    def close(self) -> None:
+        try:
+            self.release_all()
+        finally:
+            self._conn.close()
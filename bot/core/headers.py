@@ -1,7 +1,8 @@
 import re
+from types import MappingProxyType
 
 
-headers = {
+headers = MappingProxyType({
     'Accept': 'application/json, text/plain, */*',
     'Accept-Language': 'en-US,en;q=0.9',
     'Connection': 'keep-alive',
@@ -14,7 +15,9 @@ headers = {
     'sec-ch-ua-platform': '"Android"',
     'sec-ch-ua-mobile': "?1",
     'X-Requested-With': 'org.telegram.messenger.web'
-}
+})
+
+_header_profiles: dict[str, MappingProxyType] = {}
 
 
 def get_sec_ch_ua(user_agent):
@@ -33,4 +36,18 @@ def get_sec_ch_ua(user_agent):
 
         return {'Sec-Ch-Ua': sec_ch_ua}
     else:
-        return {}
\ No newline at end of file
+        return {}
+
+
+def build_header_profile(session_name: str, user_agent: str) -> MappingProxyType:
+    profile = _header_profiles.get(session_name)
+    if profile is not None and profile['User-Agent'] == user_agent:
+        return profile
+
+    profile = MappingProxyType({**headers, 'User-Agent': user_agent, **get_sec_ch_ua(user_agent)})
+    _header_profiles[session_name] = profile
+    return profile
+
+
+def get_header_profile(session_name: str) -> MappingProxyType | None:
+    return _header_profiles.get(session_name)
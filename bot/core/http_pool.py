@@ -0,0 +1,148 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from time import monotonic
+from typing import Callable, Mapping
+from urllib.parse import urlsplit
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.proxy_manager import proxy_manager
+from bot.core.rate_limiter import rate_limiter
+from bot.core.retry import RETRYABLE_STATUSES, classify_response, retry_policy
+from bot.core.admission import admission_controller
+from bot.core.timeouts import Deadline, endpoint_timeout, is_timeout, timeout_stats, wait_for
+from bot.exceptions import ApiError, DeadlineExceeded, RequestTimeout
+
+
+class HttpSessionPool:
+    def __init__(self, max_clients: int | None = None):
+        self.max_clients = max_clients or settings.HTTP_POOL_MAX_CLIENTS
+        self._sessions: dict[tuple[str | None, str], object] = {}
+
+    def get(self, proxy: str | None, host: str):
+        key = (proxy, host)
+        session = self._sessions.get(key)
+        if session is None:
+            from curl_cffi import requests
+
+            # impersonate negotiates HTTP/2 over ALPN where the server supports it
+            session = requests.AsyncSession(impersonate="chrome124", max_clients=self.max_clients)
+            if proxy:
+                session.proxies = {"http": proxy, "https": proxy}
+            self._sessions[key] = session
+        return session
+
+    @asynccontextmanager
+    async def slot(self, proxy: str | None, host: str):
+        """Waits for the host's rate limit and a free request slot on the proxy"""
+        await rate_limiter.acquire(host)
+        async with proxy_manager.limit(proxy):
+            yield
+
+    async def send(self, method: str, url: str, proxy: str | None = None, **kwargs):
+        session = self.get(proxy, urlsplit(url).hostname)
+        try:
+            return await session.request(method, url, **kwargs)
+        finally:
+            # Pooled sessions are shared between accounts, so their cookie jar must stay empty
+            session.cookies.clear()
+
+    async def request(self, method: str, url: str, proxy: str | None = None, **kwargs):
+        async with self.slot(proxy, urlsplit(url).hostname):
+            return await self.send(method, url, proxy=proxy, **kwargs)
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception as error:
+                logger.warning(f"Error while closing HTTP session: {error}")
+
+
+class CycleCache(dict):
+    def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self.pop(key, None)
+
+
+class SessionHttpClient:
+    def __init__(self, pool: HttpSessionPool, proxy: str | None, headers: Mapping[str, str],
+                 auth: Callable[[], dict] | None = None, deadline: Deadline | None = None,
+                 cookies: dict[str, dict] | None = None):
+        self.pool = pool
+        self.proxy = proxy
+        self.headers = dict(headers)
+        self.auth = auth
+        # Per-account cookies by host, sent with every request instead of living in the shared session
+        self.cookies = {} if cookies is None else cookies
+        self.deadline = deadline or Deadline()
+        self.cache = CycleCache()
+
+    async def request(self, method: str, url: str, headers: dict | None = None, timeout: float | None = None,
+                      **kwargs):
+        path = urlsplit(url).path
+        host = urlsplit(url).hostname
+        if self.deadline.remaining() == 0:
+            timeout_stats.record('cycle deadline')
+            raise DeadlineExceeded(f"Cycle deadline exceeded before {method} {path}")
+
+        async with AsyncExitStack() as stack:
+            # Queueing behind the local rate limiter and proxy slots is no fault of the host,
+            # only the cycle deadline bounds it, the endpoint timeout starts once the request is sent
+            try:
+                await wait_for(stack.enter_async_context(self.pool.slot(self.proxy, host)),
+                               self.deadline.remaining(), 'cycle deadline')
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Cycle deadline exceeded waiting to send {method} {path}") from None
+
+            if timeout is None:
+                timeout = endpoint_timeout(url)
+            # A non-positive endpoint timeout means no limit of its own, only the cycle deadline applies
+            timeout = self.deadline.limit(timeout if timeout and timeout > 0 else None)
+
+            request_headers = {**self.headers, **(self.auth() if self.auth else {}), **(headers or {})}
+            cookies = self.cookies.setdefault(host, {})
+            started = monotonic()
+            try:
+                response = await wait_for(self.pool.send(method, url, proxy=self.proxy, headers=request_headers,
+                                                         cookies={**cookies, **kwargs.pop('cookies', {})},
+                                                         timeout=timeout, **kwargs),
+                                          timeout, f"{method} {path}")
+                admission_controller.observe(response.status_code not in RETRYABLE_STATUSES,
+                                             monotonic() - started)
+                cookies.update(response.cookies)
+                return response
+            except Exception as error:
+                admission_controller.observe(False, monotonic() - started)
+                if not is_timeout(error):
+                    raise
+                if not isinstance(error, asyncio.TimeoutError):
+                    timeout_stats.record(f"{method} {path}")
+                after = f" after {timeout:.1f}s" if timeout is not None else ''
+                raise RequestTimeout(f"{method} {path} timed out{after}") from error
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def request_json(self, method: str, url: str, **kwargs) -> tuple[int, object]:
+        response = await self.request(method, url, **kwargs)
+
+        error = classify_response(response.status_code, response.text)
+        if error is not None:
+            raise error
+
+        try:
+            return response.status_code, response.json()
+        except ValueError as exc:
+            raise ApiError(f"Invalid JSON response: {response.text[:200]}", response.status_code) from exc
+
+    async def call(self, method: str, url: str, **kwargs) -> tuple[int, object]:
+        return await retry_policy.call(urlsplit(url).hostname, lambda: self.request_json(method, url, **kwargs))
+
+
+http_pool = HttpSessionPool()
@@ -0,0 +1,55 @@
+import asyncio
+from time import monotonic
+
+from bot.config import settings
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        self._lock: asyncio.Lock | None = None
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        started = monotonic()
+        # The lock keeps waiters in FIFO order, so no session is starved under load
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+        return monotonic() - started
+
+
+class HostRateLimiter:
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def get_bucket(self, host: str) -> TokenBucket | None:
+        if host not in settings.RATE_LIMITED_HOSTS or settings.API_RATE_LIMIT <= 0:
+            return None
+
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(settings.API_RATE_LIMIT, settings.API_RATE_BURST)
+        return bucket
+
+    async def acquire(self, host: str) -> float:
+        bucket = self.get_bucket(host)
+        if bucket is None:
+            return 0.0
+        return await bucket.acquire()
+
+
+rate_limiter = HostRateLimiter()
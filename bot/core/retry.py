@@ -0,0 +1,148 @@
+import asyncio
+import random
+from time import monotonic
+from typing import Awaitable, Callable, TypeVar
+
+from bot.config import settings
+from bot.exceptions import ApiError, AuthError, RetryableApiError, CircuitOpenError, DeadlineExceeded
+from bot.utils import logger
+
+T = TypeVar('T')
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+AUTH_STATUSES = frozenset({401, 403})
+
+
+def classify_response(status: int, text: str = '') -> ApiError | None:
+    if status < 400:
+        return None
+    if status in AUTH_STATUSES:
+        return AuthError(f"HTTP {status}: {text[:200]}", status)
+    if status in RETRYABLE_STATUSES:
+        return RetryableApiError(f"HTTP {status}: {text[:200]}", status)
+    return ApiError(f"HTTP {status}: {text[:200]}", status)
+
+
+def classify_exception(error: Exception) -> ApiError:
+    if isinstance(error, ApiError):
+        return error
+    # Transport failures (timeouts, resets, proxy and TLS errors) are worth another attempt
+    return RetryableApiError(f"{type(error).__name__}: {error}")
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != 'half-open':
+            return state == 'closed'
+        # Half-open lets a single trial call through, the rest wait for its outcome
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def release(self) -> None:
+        """Gives up the trial slot of a call that ended without an outcome"""
+        self.probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        state = self.state
+        if state == 'half-open' or (state == 'closed' and self.failures >= self.failure_threshold):
+            logger.warning(f"Circuit opened after {self.failures} failures, pausing requests "
+                           f"for {self.reset_timeout}s")
+            self.opened_at = monotonic()
+
+
+class RetryBudget:
+    def __init__(self, ratio: float, min_per_second: float, cap: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.cap = cap
+        self.balance = cap
+        self._updated = monotonic()
+
+    def deposit(self) -> None:
+        self.balance = min(self.cap, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        now = monotonic()
+        self.balance = min(self.cap, self.balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+class RetryPolicy:
+    def __init__(self):
+        self.budget = RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MIN_PER_SECOND,
+                                  settings.RETRY_BUDGET_CAP)
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD,
+                                                            settings.CIRCUIT_RESET_TIMEOUT)
+        return breaker
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        return random.uniform(0, min(settings.RETRY_MAX_DELAY, settings.RETRY_BASE_DELAY * 2 ** attempt))
+
+    async def call(self, host: str, func: Callable[[], Awaitable[T]]) -> T:
+        breaker = self.breaker(host)
+        attempts = max(settings.MAX_RETRIES, 1)
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit for {host} is open")
+
+            self.budget.deposit()
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as error:
+                error = classify_exception(error)
+                if isinstance(error, DeadlineExceeded):
+                    # Running out of cycle time says nothing about the host
+                    breaker.release()
+                    raise error
+                if not isinstance(error, RetryableApiError):
+                    breaker.record_success()
+                    raise error
+                breaker.record_failure()
+                if attempt == attempts - 1 or not self.budget.withdraw():
+                    raise error
+                await asyncio.sleep(self.backoff(attempt))
+            else:
+                breaker.record_success()
+                return result
+
+
+retry_policy = RetryPolicy()
@@ -0,0 +1,251 @@
+import asyncio
+import heapq
+from collections import deque
+from itertools import count
+from typing import Callable
+from time import monotonic, time
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils import logger
+from bot.utils.proxy_manager import proxy_manager
+from bot.core.upgrades_cache import upgrades_cache
+from bot.core.accrual import accrual_tracker
+from bot.core.admission import admission_controller
+from bot.core.timeouts import timeout_stats
+
+
+class SessionScheduler:
+    def __init__(self, workers: int | None = None, stats_hook: Callable[[dict], None] | None = None,
+                 persistent: bool = False):
+        self.workers = workers or settings.MAX_ACTIVE_SESSIONS
+        self.stats_hook = stats_hook
+        # A persistent scheduler keeps running with no sessions, waiting for new ones to be added
+        self.persistent = persistent
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.sessions = {}
+        self.running: set[str] = set()
+        self.active = 0
+        self._heap: list[tuple[float, int, str]] = []
+        self._due: dict[str, float] = {}
+        self._last_due: dict[str, float] = {}
+        self._seq = count()
+        self._wakeup = asyncio.Event()
+        self._worker_tasks: list[asyncio.Task] = []
+        self._dispatcher: asyncio.Task | None = None
+        self._pending: deque = deque()
+        self._pending_added = asyncio.Event()
+        self._admitter: asyncio.Task | None = None
+        self._attached: list[asyncio.Task] = []
+        self._busy_time = 0.0
+        self._started = monotonic()
+        self._finished = asyncio.Event()
+        self._stopping = False
+
+    def add(self, tapper, delay: float = 0) -> None:
+        if self._stopping:
+            return
+        self.sessions[tapper.session_name] = tapper
+        self._finished.clear()
+        self._push(tapper.session_name, monotonic() + max(delay, 0))
+
+    def admit(self, tapper) -> None:
+        """Queues a new session to start at the pace of the admission controller"""
+        if self._stopping:
+            return
+        if not admission_controller.enabled:
+            self.add(tapper)
+            return
+
+        self.sessions[tapper.session_name] = tapper
+        self._finished.clear()
+        self._pending.append(tapper)
+        self._pending_added.set()
+
+    def attach(self, task: asyncio.Task) -> None:
+        """Ties a task that feeds sessions in (watcher, lease coordinator) to the scheduler, it stops before the drain"""
+        self._attached.append(task)
+
+    def spread(self, interval: float, names: list[str] | None = None) -> None:
+        """Spreads the next run of the given (by default every) waiting session evenly over the interval"""
+        names = sorted(self._due if names is None else [name for name in names if name in self._due],
+                       key=self._due.get)
+        if not names:
+            return
+
+        now = monotonic()
+        step = interval / len(names)
+        for index, name in enumerate(names):
+            self._push(name, now + index * step)
+
+    def _push(self, session_name: str, due: float) -> None:
+        self._due[session_name] = due
+        heapq.heappush(self._heap, (due, next(self._seq), session_name))
+        if self._heap[0][2] == session_name:
+            self._wakeup.set()
+
+    def _reschedule(self, tapper, delay: float) -> None:
+        # Fixed-rate: the next run is counted from the previous due time, so sessions keep their slot
+        previous_due = self._last_due.get(tapper.session_name, monotonic())
+        self._push(tapper.session_name, max(previous_due + max(delay, 0), monotonic()))
+
+    def remove(self, session_name: str) -> None:
+        self.sessions.pop(session_name, None)
+        self._due.pop(session_name, None)
+        self._last_due.pop(session_name, None)
+        accrual_tracker.remove(session_name)
+        if not self.sessions and not self.persistent:
+            self._finished.set()
+
+    async def _dispatch(self) -> None:
+        while True:
+            now = monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, name = heapq.heappop(self._heap)
+                if self._due.get(name) != due:
+                    continue
+                del self._due[name]
+                tapper = self.sessions.get(name)
+                if tapper is not None:
+                    self._last_due[name] = due
+                    self.running.add(name)
+                    self.queue.put_nowait(tapper)
+
+            timeout = self._heap[0][0] - monotonic() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _admit(self) -> None:
+        while True:
+            while not self._pending:
+                self._pending_added.clear()
+                await self._pending_added.wait()
+
+            await admission_controller.wait()
+            while self._pending:
+                tapper = self._pending.popleft()
+                # Skip sessions removed or replaced while they were waiting
+                if self.sessions.get(tapper.session_name) is tapper:
+                    self._push(tapper.session_name, monotonic())
+                    break
+
+    async def _worker(self) -> None:
+        while True:
+            tapper = await self.queue.get()
+            self.active += 1
+            started = monotonic()
+            delay = None
+            try:
+                delay = await tapper.run_cycle()
+            except InvalidSession:
+                logger.error(f"{tapper.session_name} | 😢 Invalid Session 😢")
+            except Exception as error:
+                logger.error(f"{tapper.session_name} | Unexpected error in cycle: {error}")
+                delay = 120
+            finally:
+                self.active -= 1
+                self._busy_time += monotonic() - started
+                self.running.discard(tapper.session_name)
+                self.queue.task_done()
+
+            if self.sessions.get(tapper.session_name) is not tapper:
+                # Removed or replaced while the cycle was running
+                continue
+            if delay is None:
+                self.remove(tapper.session_name)
+            else:
+                self._reschedule(tapper, delay)
+
+    def due_times(self) -> dict[str, float]:
+        """Wall-clock time of the next run of every waiting session"""
+        offset = time() - monotonic()
+        return {name: due + offset for name, due in self._due.items()}
+
+    def stop(self) -> None:
+        """Stops dispatching new cycles, run() then drains the running ones and returns"""
+        if self._stopping:
+            # A second signal skips the drain
+            for task in self._worker_tasks:
+                task.cancel()
+            return
+        self._stopping = True
+        self._finished.set()
+
+    async def _stop_attached(self) -> None:
+        for task in self._attached:
+            task.cancel()
+        await asyncio.gather(*self._attached, return_exceptions=True)
+
+    async def _drain(self, timeout: float) -> None:
+        await self._stop_attached()
+        self._dispatcher.cancel()
+        self._admitter.cancel()
+        while not self.queue.empty():
+            tapper = self.queue.get_nowait()
+            self.running.discard(tapper.session_name)
+            self._push(tapper.session_name, self._last_due.get(tapper.session_name, monotonic()))
+            self.queue.task_done()
+
+        if self.active:
+            logger.info(f"Waiting up to {timeout}s for {self.active} running cycles to finish")
+        deadline = monotonic() + timeout
+        while self.active and monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.active:
+            logger.warning(f"Cancelling {self.active} cycles still running after {timeout}s")
+
+    def stats(self) -> dict:
+        elapsed = max(monotonic() - self._started, 1e-9)
+        next_due = min(self._due.values(), default=None)
+        return {
+            'sessions': len(self.sessions),
+            'waiting': len(self._due),
+            'pending': len(self._pending),
+            'queue_depth': self.queue.qsize(),
+            'active': self.active,
+            'workers': self.workers,
+            'utilization': self.active / self.workers,
+            'avg_utilization': min(self._busy_time / (elapsed * self.workers), 1.0),
+            'next_due_in': max(next_due - monotonic(), 0) if next_due is not None else None,
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logger.info(f"Scheduler | sessions: {stats['sessions']} | waiting: {stats['waiting']} | "
+                    f"pending: {stats['pending']} | "
+                    f"queue: {stats['queue_depth']} | active: {stats['active']}/{stats['workers']} | "
+                    f"utilization: {stats['utilization']:.0%} (avg {stats['avg_utilization']:.0%})")
+        proxy_manager.log_wait_stats()
+
+        catalog = upgrades_cache.stats()
+        logger.info(f"Upgrades cache | entries: {catalog['entries']} | hits: {catalog['hits']} | "
+                    f"misses: {catalog['misses']} | hit rate: {catalog['hit_rate']:.0%}")
+        timeout_stats.log_stats()
+
+    async def run(self) -> None:
+        self._started = monotonic()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self._admitter = asyncio.create_task(self._admit())
+        self._worker_tasks += [self._dispatcher, self._admitter]
+        if not self.sessions and not self.persistent:
+            self._finished.set()
+
+        try:
+            while not self._stopping and not self._finished.is_set():
+                try:
+                    await asyncio.wait_for(self._finished.wait(), timeout=settings.SCHEDULER_STATS_INTERVAL)
+                except asyncio.TimeoutError:
+                    self.log_stats()
+                    if self.stats_hook is not None:
+                        self.stats_hook(self.stats())
+            if self._stopping:
+                await self._drain(settings.SHUTDOWN_TIMEOUT)
+        finally:
+            await self._stop_attached()
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
@@ -0,0 +1,96 @@
+import asyncio
+import os
+from typing import Callable, Iterable
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.account_registry import Account, account_registry
+
+
+class SessionWatcher:
+    def __init__(self, accounts: Iterable[Account], discover: Callable[[], list[str]],
+                 owns: Callable[[str], bool] | None = None, interval: float | None = None):
+        self.discover = discover
+        self.owns = owns or (lambda session_name: True)
+        self.interval = settings.SESSIONS_RELOAD_INTERVAL if interval is None else interval
+        # Proxy and User-Agent each running session was started with
+        self.applied = {account.session_name: (account.proxy, account.user_agent) for account in accounts}
+        self._names = set(discover())
+        self._stamp = self._stat()
+        self._pending = False
+        self._missing: set[str] = set()
+
+    @staticmethod
+    def _stat() -> tuple:
+        if settings.ACCOUNTS_BACKEND == 'sqlite':
+            # accounts.json edits are imported first; the version moves only on account writes, not on state saves
+            store = account_registry.store
+            store.sync_from_json(account_registry.path)
+            return store.accounts_version(),
+        try:
+            return os.stat(account_registry.path).st_mtime_ns,
+        except OSError:
+            return None,
+
+    def poll(self, busy: set[str] = frozenset()) -> tuple[list[Account], list[str], list[Account]]:
+        """Diffs the session files and accounts against the running set; returns (added, removed, changed)"""
+        names = set(self.discover())
+        stamp = self._stat()
+        if names == self._names and stamp == self._stamp and not self._pending:
+            return [], [], []
+
+        if stamp != self._stamp:
+            account_registry.load(reload=True)
+        self._names, self._stamp = names, stamp
+
+        desired = {}
+        for session_name in names:
+            if not self.owns(session_name):
+                continue
+            account = account_registry.get(session_name)
+            if account is not None:
+                desired[session_name] = account
+            elif session_name not in self._missing:
+                logger.warning(f"{session_name}.session does not exist in accounts, add it to start the session")
+        self._missing = {name for name in names if self.owns(name) and name not in desired}
+
+        added, removed, changed = [], [], []
+        # Sessions in the middle of a cycle are picked up on a later poll, so no cycle runs twice
+        self._pending = False
+        for session_name in set(self.applied) | set(desired):
+            if session_name in busy:
+                self._pending = True
+                continue
+
+            account = desired.get(session_name)
+            if account is None:
+                removed.append(session_name)
+                del self.applied[session_name]
+            elif session_name not in self.applied:
+                added.append(account)
+                self.applied[session_name] = (account.proxy, account.user_agent)
+            elif self.applied[session_name] != (account.proxy, account.user_agent):
+                changed.append(account)
+                self.applied[session_name] = (account.proxy, account.user_agent)
+
+        if added or removed or changed:
+            logger.info(f"Sessions reloaded | added: {len(added)} | removed: {len(removed)} | "
+                        f"reconfigured: {len(changed)} | total: {len(self.applied)}")
+        return added, removed, changed
+
+    async def run(self, busy: Callable[[], set[str]], on_add: Callable[[Account], None],
+                  on_remove: Callable[[str], None], on_change: Callable[[Account], None]) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                added, removed, changed = self.poll(busy())
+            except Exception as error:
+                logger.error(f"Can't reload sessions: {error}")
+                continue
+
+            for session_name in removed:
+                on_remove(session_name)
+            for account in changed:
+                on_change(account)
+            for account in added:
+                on_add(account)
@@ -1,36 +1,36 @@
 import asyncio
 import random
 
-from datetime import datetime, timedelta, timezone
-from dateutil import parser
 from time import time
 from urllib.parse import unquote ,quote
-import json
-import re
 
-from curl_cffi import requests
-
-from better_proxy import Proxy
-from pyrogram import Client
-from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
-from pyrogram.raw.functions.messages import RequestAppWebView
 from pyrogram.raw.functions.messages import RequestWebView
-from pyrogram.raw import types
 from bot.core.agents import generate_random_user_agent
-from bot.core.headers import headers, get_sec_ch_ua
+from bot.core.headers import build_header_profile, get_header_profile
+from bot.core.tg_pool import tg_client_pool
+from bot.core.http_pool import SessionHttpClient, http_pool
+from bot.core.auth_cache import auth_cache
+from bot.core.token_refresher import token_refresher
+from bot.core.upgrades_cache import upgrades_cache
+from bot.core.accrual import accrual_tracker
+from bot.core.timeouts import Deadline, wait_for
 
 
 from bot.utils import logger
 from bot.utils.logger import SelfTGClient
-from bot.exceptions import InvalidSession
+from bot.utils.account_registry import Account, account_registry
+from bot.utils.proxy_manager import proxy_manager
+from bot.exceptions import InvalidSession, ApiError, AuthError
 from bot.config import settings
 
 self_tg_client = SelfTGClient()
 
 class Tapper:
-    def __init__(self, tg_client: Client):
-        self.session_name = tg_client.name
-        self.tg_client = tg_client
+    def __init__(self, session_name: str, account: Account | None = None):
+        self.session_name = session_name
+        self.account = account
+        self.proxy = proxy_manager.format_proxy(account.proxy) if account else None
+        self.http_proxy = self.proxy if settings.USE_PROXY_FROM_FILE else None
         self.user_id = 0
         self.username = None
         self.first_name = None
@@ -40,12 +40,37 @@ class Tapper:
         self.peer = None
         self.first_run = None
         self.scraper = None
+        self.pickaxe_level = None
+        self.cookies: dict[str, dict] = {}
+
+        self.access_token = None
+        self.login_need = True
+        self.login_failed = False
+        self.invalid_session = False
+        self.access_token_created_time = 0
+        self.token_live_time = random.randint(4000, 4600)
+
+        self.restore_auth()
 
-        self.session_ug_dict = self.load_user_agents() or []
+        self.headers = get_header_profile(self.session_name)
+        if self.headers is None:
+            self.headers = build_header_profile(self.session_name, self.check_user_agent())
 
-        user_agent = self.check_user_agent()
-        headers['User-Agent'] = user_agent
-        headers.update(**get_sec_ch_ua(user_agent))
+    def restore_auth(self):
+        identity = auth_cache.get_identity(self.session_name)
+        if identity:
+            self.user_id = identity['user_id']
+            self.first_name = identity['first_name']
+            self.last_name = identity['last_name']
+            self.username = identity['username']
+
+        token = auth_cache.get_token(self.session_name)
+        if token:
+            self.access_token, self.access_token_created_time, self.token_live_time = token
+            self.login_need = False
+
+        # Keeps the upgrade catalog keyed by level across restarts
+        self.pickaxe_level = auth_cache.get_pickaxe_level(self.session_name)
 
     async def generate_random_user_agent(self):
         return generate_random_user_agent()
@@ -58,22 +83,6 @@ class Tapper:
         from bot.utils import debug
         debug(f"<light-yellow>{self.session_name}</light-yellow> | {message}")
 
-    def check_timeout_error(self, error):
-        try:
-            error_message = str(error)
-            is_timeout_error = re.search("504, message='Gateway Timeout'", error_message)
-            return is_timeout_error
-        except Exception as e:
-            return False
-
-    def check_error(self, error, message):
-        try:
-            error_message = str(error)
-            is_equal = re.search(message, error_message)
-            return is_equal
-        except Exception as e:
-            return False
-
     def warning(self, message):
         from bot.utils import warning
         warning(f"<light-yellow>{self.session_name}</light-yellow> | {message}")
@@ -91,106 +100,63 @@ class Tapper:
         success(f"<light-yellow>{self.session_name}</light-yellow> | {message}")
 
     def save_user_agent(self):
-        user_agents_file_name = "user_agents.json"
-
-        if not any(session['session_name'] == self.session_name for session in self.session_ug_dict):
-            user_agent_str = generate_random_user_agent()
-
-            self.session_ug_dict.append({
-                'session_name': self.session_name,
-                'user_agent': user_agent_str})
-
-            with open(user_agents_file_name, 'w') as user_agents:
-                json.dump(self.session_ug_dict, user_agents, indent=4)
-
-            logger.success(f"<light-yellow>{self.session_name}</light-yellow> | User agent saved successfully")
+        user_agent_str = generate_random_user_agent()
 
-            return user_agent_str
-
-    def load_user_agents(self):
-        user_agents_file_name = f'sessions/accounts.json'
-
-        try:
-            with open(user_agents_file_name, 'r') as user_agents:
-                session_data = json.load(user_agents)
-                if isinstance(session_data, list):
-                    return session_data
-
-        except FileNotFoundError:
-            logger.warning("User agents file not found, creating...")
+        if self.session_name in account_registry:
+            account_registry.set_user_agent(self.session_name, user_agent_str)
+        else:
+            account_registry.add(Account(self.session_name, user_agent_str))
 
-        except json.JSONDecodeError:
-            logger.warning("User agents file is empty or corrupted.")
+        logger.success(f"<light-yellow>{self.session_name}</light-yellow> | User agent saved successfully")
 
-        return []
+        return user_agent_str
 
     def check_user_agent(self):
-        load = next(
-            (session['user_agent'] for session in self.session_ug_dict if session['session_name'] == self.session_name),
-            None)
+        account = self.account or account_registry.get(self.session_name)
 
-        if load is None:
+        if account is None or not account.user_agent:
             return self.save_user_agent()
 
-        return load
+        return account.user_agent
 
     async def get_tg_web_data(self, proxy: str | None) -> str:
-        if proxy:
-            proxy = Proxy.from_str(proxy)
-            proxy_dict = dict(
-                scheme=proxy.protocol,
-                hostname=proxy.host,
-                port=proxy.port,
-                username=proxy.login,
-                password=proxy.password
-            )
-        else:
-            proxy_dict = None
-
-        self.tg_client.proxy = proxy_dict
-
         try:
-            with_tg = True
-
-            if not self.tg_client.is_connected:
-                with_tg = False
+            async with tg_client_pool.lease(self.session_name, proxy) as tg_client:
+                if settings.USE_REF == True:
+                    ref_id = settings.REF_ID
+                else:
+                    ref_id = random.choice(['T7B3IMWS'])
+
+                self.start_param = random.choices([ref_id, 'T7B3IMWS'], weights=[70, 30], k=1)[0]
+                peer = auth_cache.get_peer(self.session_name)
+                if peer is None:
+                    peer = await wait_for(tg_client.resolve_peer('LumCity_bot'), settings.TG_INVOKE_TIMEOUT,
+                                          'tg invoke')
+                    auth_cache.save_peer(self.session_name, peer)
+
+                web_view = await wait_for(tg_client.invoke(RequestWebView(
+                    peer=peer,
+                    bot=peer,
+                    platform='android',
+                    from_bot_menu=False,
+                    url='https://lumcity.app/app'
+                )), settings.TG_INVOKE_TIMEOUT, 'tg invoke')
+
+                auth_url = web_view.url
+                tg_web_data = unquote(string=unquote(string=auth_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0]))
                 try:
-                    await self.tg_client.connect()
-                except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
-                    raise InvalidSession(self.session_name)
-
-            if settings.USE_REF == True:
-                ref_id = settings.REF_ID
-            else:
-                ref_id = random.choice(['T7B3IMWS'])
-
-            self.start_param = random.choices([ref_id, 'T7B3IMWS'], weights=[70, 30], k=1)[0]
-            peer = await self.tg_client.resolve_peer('LumCity_bot')
-
-            web_view = await self.tg_client.invoke(RequestWebView(
-                peer=peer,
-                bot=peer,
-                platform='android',
-                from_bot_menu=False,
-                url='https://lumcity.app/app'
-            ))
-
-            auth_url = web_view.url
-            tg_web_data = unquote(string=unquote(string=auth_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0]))
-            try:
-                if self.user_id == 0:
-                    information = await self.tg_client.get_me()
-                    self.user_id = information.id
-                    self.first_name = information.first_name or ''
-                    self.last_name = information.last_name or ''
-                    self.username = information.username or ''
-            except Exception as e:
-                self.error(f'Error during get tg web data: {e}')
-
-            if with_tg is False:
-                await self.tg_client.disconnect()
-
-            return tg_web_data
+                    if self.user_id == 0:
+                        information = await wait_for(tg_client.get_me(), settings.TG_INVOKE_TIMEOUT, 'tg invoke')
+                        self.user_id = information.id
+                        self.first_name = information.first_name or ''
+                        self.last_name = information.last_name or ''
+                        self.username = information.username or ''
+                        auth_cache.save_identity(self.session_name, self.user_id, self.first_name,
+                                                 self.last_name, self.username)
+                except Exception as e:
+                    self.error(f'Error during get tg web data: {e}')
+
+                return tg_web_data
 
         except InvalidSession as error:
             raise error
@@ -223,238 +189,281 @@ class Tapper:
         output_string = await self.transform_input_string(initdata)
         url = "https://back.lumcity.app/jwt/token?"
 
+        try:
+            _, resp_json = await http_client.call("GET", url+output_string)
+        except ApiError as e:
+            self.error(f"Login failed: {e}")
+            return False
 
-        for retry_count in range(settings.MAX_RETRIES):
-            try:
-                response = await http_client.get(url+output_string)
-
-                response.raise_for_status()
-
-                resp_json = response.json()
-
-                if not resp_json.get('accessToken'):
-                    self.error(f"Error during login | Invalid server response: {resp_json}")
-                    return False
-
-                logger.success(f"<light-yellow>{self.session_name}</light-yellow> | Login successful.")
-                return resp_json.get("accessToken")
-
-            except Exception as e:
-                self.error(f"Error during login attempt {retry_count + 1}: {e}")
-                await asyncio.sleep(delay=random.randint(5, 10))
-                if retry_count == settings.MAX_RETRIES - 1:
-                    await asyncio.sleep(delay=random.randint(5, 10))
-                continue
+        if not resp_json.get('accessToken'):
+            self.error(f"Error during login | Invalid server response: {resp_json}")
+            return False
 
-        self.error("Login failed after max retries.")
-        return False
+        logger.success(f"<light-yellow>{self.session_name}</light-yellow> | Login successful.")
+        return resp_json.get("accessToken")
 
     async def upgrade(self, http_client):
         url = "https://back.lumcity.app/miner-upgrades/all-upgrades"
 
-        for retry_count in range(settings.MAX_RETRIES):
-            try:
-                await asyncio.sleep(delay=random.randint(3, 5))
-                response = await http_client.get(url)
+        if 'upgrades' in http_client.cache:
+            return http_client.cache['upgrades']
 
-                response.raise_for_status()
-                resp_json = response.json()
-                return resp_json
+        catalog = upgrades_cache.get(self.catalog_key)
+        if catalog is not None:
+            http_client.cache['upgrades'] = catalog
+            return catalog
 
-            except Exception as e:
-                if retry_count == settings.MAX_RETRIES - 1:
-                    await asyncio.sleep(delay=random.randint(1, 3))
-                continue
+        try:
+            _, resp_json = await http_client.call("GET", url)
+            http_client.cache['upgrades'] = resp_json
+            self.update_level(resp_json)
+            upgrades_cache.set(self.catalog_key, resp_json)
+            return resp_json
+        except AuthError:
+            raise
+        except ApiError as e:
+            self.error(f"Unknown error during getting upgrades: <light-yellow>{e}</light-yellow>")
+            return None
 
     async def upgrades(self, http_client):
         url = "https://back.lumcity.app/miner-upgrades/buy"
         data = {"type":"pickaxe","tokenId":1}
-        for retry_count in range(settings.MAX_RETRIES):
-            try:
-                await asyncio.sleep(delay=random.randint(3, 5))
-                response = await http_client.post(url, json=data)
 
-                response.raise_for_status()
-                resp_json = response.json()
-                return response.status_code, resp_json.get('pickaxeLevel') if resp_json.get("success") else response.text
-
-            except Exception as e:
-                if retry_count == settings.MAX_RETRIES - 1:
-                    await asyncio.sleep(delay=random.randint(1, 3))
-                continue
+        http_client.cache.invalidate('storage', 'user_info', 'upgrades')
+        try:
+            status, resp_json = await http_client.call("POST", url, json=data)
+            if not resp_json.get("success"):
+                return status, resp_json
+
+            # A level-keyed entry stays valid for other accounts at that level, this account just moves on
+            if self.pickaxe_level is None:
+                upgrades_cache.invalidate(self.catalog_key)
+            self.update_level(resp_json)
+            return status, self.pickaxe_level
+        except AuthError:
+            raise
+        except ApiError as e:
+            return e.status, str(e)
 
     async def get_user_info(self, http_client):
 
         url = 'https://back.lumcity.app/miner/storage/balance/'
-        for retry_count in range(settings.MAX_RETRIES):
-            try:
-                await asyncio.sleep(delay=2)
-                response = await http_client.get(url)
-                response.raise_for_status()
-
-                user_data = response.json()
-                return user_data
-
-            except Exception as e:
-                if retry_count == settings.MAX_RETRIES - 1:
-                    self.error(f"Unknown error during getting user info: <light-yellow>{e}</light-yellow>")
-                await asyncio.sleep(delay=random.randint(5, 10))
-                continue
-        return None
+        if 'user_info' in http_client.cache:
+            return http_client.cache['user_info']
+
+        try:
+            _, user_data = await http_client.call("GET", url)
+            http_client.cache['user_info'] = user_data
+            self.update_level(user_data)
+            return user_data
+        except AuthError:
+            raise
+        except ApiError as e:
+            self.error(f"Unknown error during getting user info: <light-yellow>{e}</light-yellow>")
+            return None
 
     async def collect(self, http_client):
 
         url = 'https://back.lumcity.app/miner/'
         data = {}
-        for retry_count in range(settings.MAX_RETRIES):
-            try:
-                await asyncio.sleep(delay=2)
-                response = await http_client.post(url, json=data)
-                response.raise_for_status()
-
-                return response.status_code, float((response.json()).get('storage')) if response.status_code == 201 else response.text
-
-            except Exception as e:
-                if retry_count == settings.MAX_RETRIES - 1:
-                    self.error(f"Unknown error during getting storage: <light-yellow>{e}</light-yellow>")
-                await asyncio.sleep(delay=random.randint(5, 10))
-                continue
+        http_client.cache.invalidate('storage', 'user_info')
+        try:
+            status, resp_json = await http_client.call("POST", url, json=data)
+            if status != 201:
+                return status, resp_json
+
+            # The collect response already carries the new storage balance
+            storage = float(resp_json.get('storage'))
+            http_client.cache['storage'] = storage
+            return status, storage
+        except AuthError:
+            raise
+        except ApiError as e:
+            self.error(f"Unknown error during collect: <light-yellow>{e}</light-yellow>")
+            return e.status, str(e)
 
     async def get_storage(self, http_client):
 
         url = 'https://back.lumcity.app/balance/all'
-        for retry_count in range(settings.MAX_RETRIES):
-            try:
-                await asyncio.sleep(delay=2)
-                response = await http_client.get(url)
-                response.raise_for_status()
-
-                return (response.json()).get("balances")[1].get("amount")
+        if 'storage' in http_client.cache:
+            return http_client.cache['storage']
 
-            except Exception as e:
-                if retry_count == settings.MAX_RETRIES - 1:
-                    self.error(f"Unknown error during getting storage: <light-yellow>{e}</light-yellow>")
-                await asyncio.sleep(delay=random.randint(5, 10))
-                continue
-
-    async def check_proxy(self, http_client) -> None:
         try:
-
-            response = await http_client.get('https://ipinfo.io/json', headers={}, timeout=5)
-
-            response.raise_for_status()
-            data = response.json()
-
-            ip = data.get('ip')
-            city = data.get('city')
-            country = data.get('country')
-            self.info(f"Check proxy! Country: <cyan>{country}</cyan> | City: <light-yellow>{city}</light-yellow> | Proxy IP: {ip}")
-            return True
-        except Exception as error:
-            self.error(f"Proxy: 😢 Error: {error}")
+            _, resp_json = await http_client.call("GET", url)
+            storage = float(resp_json.get("balances")[1].get("amount"))
+            http_client.cache['storage'] = storage
+            return storage
+        except AuthError:
+            raise
+        except ApiError as e:
+            self.error(f"Unknown error during getting storage: <light-yellow>{e}</light-yellow>")
+            return None
+
+    @staticmethod
+    async def gather(*aws):
+        results = await asyncio.gather(*aws, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    async def check_proxy(self, http_client) -> bool:
+        health = await proxy_manager.get_health(http_client.proxy)
+        if not health.ok:
+            self.error(f"Proxy: 😢 Error: {health.error}")
+        return health.ok
+
+    def update_level(self, data) -> None:
+        level = data.get('pickaxeLevel') if isinstance(data, dict) else None
+        if level is not None and level != self.pickaxe_level:
+            self.pickaxe_level = level
+            auth_cache.save_pickaxe_level(self.session_name, level)
+
+    @property
+    def catalog_key(self) -> tuple:
+        # The catalog depends on the pickaxe level, the session key is only a fallback while it is unknown
+        if self.pickaxe_level is not None:
+            return 'level', self.pickaxe_level
+        return 'session', self.session_name
+
+    def next_cycle_delay(self, target: float | None) -> int:
+        # Sleep until the miner is expected to hold the target balance, bounded so collects still happen
+        if not settings.ADAPTIVE_SCHEDULING or target is None:
+            return settings.CYCLE_INTERVAL
+
+        wait = accrual_tracker.time_until(self.session_name, target)
+        if wait is None:
+            return settings.CYCLE_INTERVAL
+        return int(min(max(wait, settings.MIN_CYCLE_INTERVAL), settings.MAX_CYCLE_INTERVAL))
+
+    def authorization(self) -> dict:
+        return {'Authorization': f"Bearer {self.access_token}"} if self.access_token else {}
+
+    def _new_http_client(self, auth: bool = True, deadline: Deadline | None = None) -> SessionHttpClient:
+        return SessionHttpClient(http_pool, self.http_proxy, self.headers, auth=self.authorization if auth else None,
+                                 deadline=deadline, cookies=self.cookies)
+
+    @property
+    def token_expires_at(self) -> float:
+        return self.access_token_created_time + self.token_live_time
+
+    async def refresh_token(self, deadline: Deadline | None = None) -> bool:
+        self.info(f"Authorization")
+        init_data = await self.get_tg_web_data(proxy=self.proxy)
+        if not init_data:
             return False
 
-    async def run(self, proxy: str | None) -> None:
-        if settings.USE_RANDOM_DELAY_IN_RUN:
-            random_delay = random.randint(settings.RANDOM_DELAY_IN_RUN[0], settings.RANDOM_DELAY_IN_RUN[1])
-            self.info(f"Bot will start in <ly>{random_delay}s</ly>")
-            await asyncio.sleep(random_delay)
-
-        access_token = None
-        login_need = True
+        http_client = self._new_http_client(auth=False, deadline=deadline)
+        access_token = await self.login(http_client, init_data)
 
-        http_client = requests.AsyncSession(impersonate="chrome124")
-        http_client.headers.update(headers)
-
-        if settings.USE_PROXY_FROM_FILE:
-            proxys = {
-                "http": proxy,
-                "https": proxy
-            }
-            http_client.proxies = proxys
-
-        self.access_token_created_time = 0
-        self.token_live_time = random.randint(4000, 4600)
-        tries_to_login = 3
-
-        while True:
-            try:
-                if not await self.check_proxy(http_client):
-                    self.error('Failed to connect to proxy server. Sleep 150 seconds.')
-                    await asyncio.sleep(150)
-                    continue
-                if time() - self.access_token_created_time >= self.token_live_time:
-                    login_need = True
-
-                if login_need:
-                    if "Authorization" in http_client.headers:
-                        del http_client.headers["Authorization"]
-                    self.info(f"Authorization")
-                    init_data = await self.get_tg_web_data(proxy=proxy)
-                    #await asyncio.sleep(delay=2000)
-                    access_token = await self.login(http_client, init_data)
-                    if not access_token:
-                        return
-
-                    http_client.headers['Authorization'] = f"Bearer {access_token}"
+        if not access_token:
+            return False
 
-                    self.access_token_created_time = time()
-                    self.token_live_time = random.randint(1500, 1900)
+        self.access_token, self.access_token_created_time, self.token_live_time = (
+            access_token, time(), random.randint(1500, 1900))
+        self.login_need = False
+        auth_cache.save_token(self.session_name, self.access_token, self.access_token_created_time,
+                              self.token_live_time)
+        return True
+
+    async def run_cycle(self) -> int | None:
+        if self.invalid_session:
+            raise InvalidSession(self.session_name)
+        if self.login_failed:
+            return None
+
+        deadline = Deadline(settings.CYCLE_TIMEOUT)
+        http_client = self._new_http_client(deadline=deadline)
+        try:
+            # Cancelling the cycle releases its proxy slot, HTTP handle and Telegram lease on the way out
+            return await wait_for(self._run_cycle(http_client), deadline.remaining(), 'cycle')
+        except asyncio.TimeoutError:
+            self.warning(f"Cycle exceeded {settings.CYCLE_TIMEOUT}s deadline, next try in 120s")
+            return 120
 
+    async def _run_cycle(self, http_client) -> int | None:
+        try:
+            if not await self.check_proxy(http_client):
+                self.error('Failed to connect to proxy server. Sleep 150 seconds.')
+                return 150
+            if time() >= self.token_expires_at:
+                self.login_need = True
 
-                    login_need = False
+            if self.login_need:
+                if token_refresher.running:
+                    token_refresher.request(self)
+                    self.info(f"Waiting for access token, next try in {settings.TOKEN_WAIT_DELAY}s")
+                    return settings.TOKEN_WAIT_DELAY
 
-                await asyncio.sleep(3)
+                if not await self.refresh_token(http_client.deadline):
+                    return None
 
-            except Exception as error:
-                self.error(f"Unknown error during login: <light-yellow>{error}</light-yellow>")
-                break
+        except Exception as error:
+            self.error(f"Unknown error during login: <light-yellow>{error}</light-yellow>")
+            return None
 
-            try:
-                await asyncio.sleep(delay=2)
+        try:
+            # user info and the upgrade catalog are independent, storage comes from collect when it runs
+            if self.pickaxe_level is None:
+                # Without a level the catalog can't be shared, user info usually carries it
                 user_info = await self.get_user_info(http_client)
-                await asyncio.sleep(delay=2)
-
-                if user_info is not None:
-                    if 'balance' in user_info:
-                        miner_balance = user_info['balance']
-                        self.info(f"Coin Balance: 💰 <light-green>{miner_balance}</light-green> 💰")
-                        miner_balance = float(miner_balance)
-                        if miner_balance >= 0.001:
-                            status, balance = await self.collect(http_client)
-                            if status == 201:
-                                storage = float(await self.get_storage(http_client))
-                                self.success(f"Collect GOLT! New balance: {storage}")
-                            else:
-                                self.error(f"Can't collect GOLT! Response {status}")
-                                continue
-                    await asyncio.sleep(delay=2)
-                    miner_upgrades_data = await self.upgrade(http_client)
-                    await asyncio.sleep(delay=2)
-
-                    storage = float(await self.get_storage(http_client))
-                    miner = miner_upgrades_data["pickaxeUpgrade"]
-                    pickaxe_price = float(miner.get("priceGolt"))
-
-                    await asyncio.sleep(delay=2)
-                    if storage >= pickaxe_price:
-                        status, storage = await self.upgrades(http_client)
+                miner_upgrades_data = await self.upgrade(http_client)
+            else:
+                user_info, miner_upgrades_data = await self.gather(
+                    self.get_user_info(http_client),
+                    self.upgrade(http_client)
+                )
+
+            target = None
+            if user_info is not None:
+                storage = None
+                miner_balance = 0.0
+                if 'balance' in user_info:
+                    miner_balance = user_info['balance']
+                    self.info(f"Coin Balance: 💰 <light-green>{miner_balance}</light-green> 💰")
+                    miner_balance = float(miner_balance)
+                    accrual_tracker.record(self.session_name, miner_balance)
+                    if miner_balance >= settings.COLLECT_THRESHOLD:
+                        status, storage = await self.collect(http_client)
                         if status == 201:
-                            self.success(f"Upgraded miner! New balance: {storage}")
+                            self.success(f"Collect GOLT! New balance: {storage}")
+                            accrual_tracker.reset(self.session_name)
+                            miner_balance = 0.0
                         else:
-                            self.error(f"Can't upgrade! Response {status}: {storage}")
+                            self.error(f"Can't collect GOLT! Response {status}")
+                            return 120
+                if storage is None:
+                    storage = await self.get_storage(http_client)
+                if miner_upgrades_data is None or storage is None:
+                    return 120
+
+                miner = miner_upgrades_data["pickaxeUpgrade"]
+                pickaxe_price = float(miner.get("priceGolt"))
+
+                if storage >= pickaxe_price:
+                    status, storage = await self.upgrades(http_client)
+                    if status == 201:
+                        self.success(f"Upgraded miner! New balance: {storage}")
+                        # A better pickaxe mines faster, the rate is learned again from the next samples
+                        accrual_tracker.reset(self.session_name, keep_rate=False)
                     else:
-                        logger.info(f"Waiting for more GOLT. remaining: {pickaxe_price - storage}")
-
-                logger.info(f"<light-yellow>{self.session_name}</light-yellow> | 💤 sleep 30 minutes 💤")
-                await asyncio.sleep(delay=1800)
+                        self.error(f"Can't upgrade! Response {status}: {storage}")
+                else:
+                    logger.info(f"Waiting for more GOLT. remaining: {pickaxe_price - storage}")
+                    # Uncollected coins count towards the price once they are collected
+                    target = max(pickaxe_price - storage, settings.COLLECT_THRESHOLD, miner_balance)
+
+            delay = self.next_cycle_delay(target)
+            logger.info(f"<light-yellow>{self.session_name}</light-yellow> | 💤 sleep {delay // 60} minutes 💤")
+            return delay
+
+        except AuthError:
+            self.warning("Access token rejected, login required")
+            self.login_need = True
+            self.access_token = None
+            auth_cache.invalidate_token(self.session_name)
+            return 0
 
-            except Exception as error:
-                self.error(f"😢 Unknown error: <light-yellow>{error}</light-yellow>")
-                await asyncio.sleep(delay=120)
-
-async def run_tapper(tg_client: Client, proxy: str | None):
-    try:
-        await Tapper(tg_client=tg_client).run(proxy=proxy)
-    except InvalidSession:
-        logger.error(f"{tg_client.name} | 😢 Invalid Session 😢")
+        except Exception as error:
+            self.error(f"😢 Unknown error: <light-yellow>{error}</light-yellow>")
+            return 120
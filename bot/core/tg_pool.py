@@ -0,0 +1,158 @@
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from time import monotonic
+
+from bot.config import settings
+from bot.core.admission import admission_controller
+from bot.core.timeouts import wait_for
+from bot.exceptions import InvalidSession
+from bot.utils import logger
+
+
+def get_proxy_dict(proxy: str | None) -> dict | None:
+    if not proxy:
+        return None
+
+    from better_proxy import Proxy
+
+    proxy = Proxy.from_str(proxy)
+    return dict(
+        scheme=proxy.protocol,
+        hostname=proxy.host,
+        port=proxy.port,
+        username=proxy.login,
+        password=proxy.password
+    )
+
+
+class TelegramClientPool:
+    def __init__(self, max_connected: int | None = None, warm_ttl: float | None = None):
+        self.max_connected = max_connected or settings.TG_MAX_CONNECTED
+        self.warm_ttl = settings.TG_CLIENT_WARM_TTL if warm_ttl is None else warm_ttl
+        self._in_use: set[str] = set()
+        self._idle: OrderedDict[str, tuple[object, float]] = OrderedDict()
+        self._condition: asyncio.Condition | None = None
+        self._reaper: asyncio.Task | None = None
+
+    @property
+    def connected(self) -> int:
+        return len(self._in_use) + len(self._idle)
+
+    def _create_client(self, session_name: str):
+        from pyrogram import Client
+
+        return Client(
+            name=session_name,
+            api_id=settings.API_ID,
+            api_hash=settings.API_HASH,
+            workdir="sessions/",
+            plugins=dict(root="bot/plugins"),
+        )
+
+    async def _acquire(self, session_name: str, proxy_dict: dict | None):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+
+        evicted = []
+        async with self._condition:
+            while True:
+                if session_name in self._idle:
+                    client, _ = self._idle.pop(session_name)
+                    self._in_use.add(session_name)
+                    break
+                if self.connected < self.max_connected:
+                    client = None
+                    self._in_use.add(session_name)
+                    break
+                if self._idle:
+                    _, (idle_client, _) = self._idle.popitem(last=False)
+                    evicted.append(idle_client)
+                    continue
+                await self._condition.wait()
+
+        for idle_client in evicted:
+            await self._disconnect(idle_client)
+
+        try:
+            if client is not None and client.proxy != proxy_dict:
+                await self._disconnect(client)
+                client = None
+
+            if client is None:
+                client = self._create_client(session_name)
+                client.proxy = proxy_dict
+                started = monotonic()
+                try:
+                    await wait_for(client.connect(), settings.TG_CONNECT_TIMEOUT, 'tg connect')
+                    admission_controller.observe(True, monotonic() - started)
+                except Exception as error:
+                    from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered
+
+                    if isinstance(error, (Unauthorized, UserDeactivated, AuthKeyUnregistered)):
+                        raise InvalidSession(session_name)
+                    admission_controller.observe(False, monotonic() - started)
+                    raise
+        except BaseException:
+            await self._release(session_name, None)
+            raise
+
+        return client
+
+    async def _release(self, session_name: str, client) -> None:
+        async with self._condition:
+            self._in_use.discard(session_name)
+            if client is not None and client.is_connected:
+                if self.warm_ttl > 0:
+                    self._idle[session_name] = (client, monotonic() + self.warm_ttl)
+                else:
+                    asyncio.create_task(self._disconnect(client))
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def lease(self, session_name: str, proxy: str | None = None):
+        client = await self._acquire(session_name, get_proxy_dict(proxy))
+        try:
+            yield client
+        except BaseException:
+            await self._disconnect(client)
+            await self._release(session_name, None)
+            raise
+        else:
+            await self._release(session_name, client)
+
+    async def _disconnect(self, client) -> None:
+        try:
+            if client.is_connected:
+                await client.disconnect()
+        except Exception as error:
+            logger.warning(f"{client.name} | Error while disconnecting Telegram client: {error}")
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(max(min(self.warm_ttl, 5), 1))
+            now = monotonic()
+            expired = []
+            async with self._condition:
+                for session_name, (client, expires_at) in list(self._idle.items()):
+                    if expires_at <= now:
+                        del self._idle[session_name]
+                        expired.append(client)
+                if expired:
+                    self._condition.notify(len(expired))
+
+            for client in expired:
+                await self._disconnect(client)
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        idle = [client for client, _ in self._idle.values()]
+        self._idle.clear()
+        for client in idle:
+            await self._disconnect(client)
+
+
+tg_client_pool = TelegramClientPool()
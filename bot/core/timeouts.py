@@ -0,0 +1,68 @@
+import asyncio
+from collections import Counter
+from time import monotonic
+from typing import Awaitable, TypeVar
+from urllib.parse import urlsplit
+
+from bot.config import settings
+from bot.utils import logger
+
+T = TypeVar('T')
+
+CURLE_OPERATION_TIMEDOUT = 28
+
+
+class Deadline:
+    __slots__ = ('expires_at',)
+
+    def __init__(self, timeout: float | None = None):
+        self.expires_at = monotonic() + timeout if timeout else None
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - monotonic(), 0.0)
+
+    def limit(self, timeout: float | None) -> float | None:
+        """Shortens the timeout so a call never outlives the deadline"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+class TimeoutStats:
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+
+    def record(self, kind: str) -> None:
+        self.counts[kind] += 1
+
+    def stats(self) -> dict[str, int]:
+        return dict(self.counts)
+
+    def log_stats(self) -> None:
+        if not self.counts:
+            return
+        details = ' | '.join(f"{kind}: {count}" for kind, count in self.counts.most_common())
+        logger.info(f"Timeouts | total: {sum(self.counts.values())} | {details}")
+
+
+def endpoint_timeout(url: str) -> float:
+    return settings.ENDPOINT_TIMEOUTS.get(urlsplit(url).path, settings.REQUEST_TIMEOUT)
+
+
+def is_timeout(error: BaseException) -> bool:
+    return isinstance(error, asyncio.TimeoutError) or getattr(error, 'code', None) == CURLE_OPERATION_TIMEDOUT
+
+
+async def wait_for(aw: Awaitable[T], timeout: float | None, kind: str) -> T:
+    """asyncio.wait_for that counts the timeout under the given kind"""
+    try:
+        return await asyncio.wait_for(aw, timeout=timeout)
+    except asyncio.TimeoutError:
+        timeout_stats.record(kind)
+        raise
+
+
+timeout_stats = TimeoutStats()
@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import random
+from itertools import count
+from time import time
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils import logger
+
+
+class TokenRefresher:
+    def __init__(self):
+        self._heap: list[tuple[float, int, str]] = []
+        self._due: dict[str, float] = {}
+        self._tappers = {}
+        self._in_flight: set[str] = set()
+        self._seq = count()
+        self._wakeup: asyncio.Event | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._refresh_tasks: set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(settings.TOKEN_REFRESH_CONCURRENCY)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, *self._refresh_tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def add(self, tapper) -> None:
+        self._tappers[tapper.session_name] = tapper
+        # Sessions without a token are refreshed on their first cycle, so startup stays paced by the scheduler
+        if tapper.access_token:
+            self._schedule(tapper)
+
+    def remove(self, session_name: str) -> None:
+        self._tappers.pop(session_name, None)
+        self._due.pop(session_name, None)
+
+    def request(self, tapper) -> None:
+        if tapper.session_name in self._in_flight:
+            return
+        self._tappers[tapper.session_name] = tapper
+        self._push(tapper.session_name, time())
+
+    def _schedule(self, tapper) -> None:
+        refresh_at = (tapper.token_expires_at - settings.TOKEN_REFRESH_LEAD_TIME
+                      - random.uniform(0, settings.TOKEN_REFRESH_SPREAD))
+        self._push(tapper.session_name, max(refresh_at, time()))
+
+    def _push(self, session_name: str, refresh_at: float) -> None:
+        if session_name in self._due and self._due[session_name] <= refresh_at:
+            return
+        self._due[session_name] = refresh_at
+        heapq.heappush(self._heap, (refresh_at, next(self._seq), session_name))
+        if self._wakeup is not None and self._heap[0][2] == session_name:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            now = time()
+            while self._heap and self._heap[0][0] <= now:
+                refresh_at, _, session_name = heapq.heappop(self._heap)
+                if self._due.get(session_name) != refresh_at:
+                    continue
+                del self._due[session_name]
+                tapper = self._tappers.get(session_name)
+                if tapper is None or session_name in self._in_flight:
+                    continue
+                self._in_flight.add(session_name)
+                task = asyncio.create_task(self._refresh(tapper))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+
+            timeout = self._heap[0][0] - time() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh(self, tapper) -> None:
+        refreshed = False
+        try:
+            async with self._semaphore:
+                refreshed = await tapper.refresh_token()
+        except InvalidSession:
+            tapper.invalid_session = True
+        except Exception as error:
+            logger.error(f"{tapper.session_name} | Token refresh failed: {error}")
+        finally:
+            self._in_flight.discard(tapper.session_name)
+
+        if refreshed:
+            self._schedule(tapper)
+        elif not tapper.invalid_session and time() < tapper.token_expires_at - settings.TOKEN_WAIT_DELAY:
+            self._push(tapper.session_name, time() + settings.TOKEN_WAIT_DELAY)
+        else:
+            if not tapper.invalid_session:
+                tapper.login_failed = True
+            self.remove(tapper.session_name)
+
+
+token_refresher = TokenRefresher()
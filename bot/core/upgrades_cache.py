@@ -0,0 +1,39 @@
+from time import monotonic
+
+from bot.config import settings
+
+
+class UpgradeCatalogCache:
+    def __init__(self, ttl: float | None = None):
+        self.ttl = settings.UPGRADES_CACHE_TTL if ttl is None else ttl
+        self._entries: dict[tuple, tuple[float, dict]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: tuple, catalog: dict) -> None:
+        if self.ttl > 0:
+            self._entries[key] = (monotonic() + self.ttl, catalog)
+
+    def invalidate(self, key: tuple) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+upgrades_cache = UpgradeCatalogCache()
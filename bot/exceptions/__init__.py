@@ -1,2 +1,28 @@
 class InvalidSession(BaseException):
     ...
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RetryableApiError(ApiError):
+    ...
+
+
+class AuthError(ApiError):
+    ...
+
+
+class CircuitOpenError(ApiError):
+    ...
+
+
+class RequestTimeout(RetryableApiError):
+    ...
+
+
+class DeadlineExceeded(ApiError):
+    ...
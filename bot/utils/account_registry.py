@@ -0,0 +1,77 @@
+from typing import Iterator
+
+from bot.utils.file_manager import get_account_store
+
+
+class Account:
+    __slots__ = ('session_name', 'user_agent', 'proxy', 'extra')
+
+    def __init__(self, session_name: str, user_agent: str | None = None, proxy: str | None = None,
+                 extra: dict | None = None):
+        self.session_name = session_name
+        self.user_agent = user_agent
+        self.proxy = proxy
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Account':
+        extra = {key: value for key, value in data.items() if key not in ('session_name', 'user_agent', 'proxy')}
+        return cls(data['session_name'], data.get('user_agent'), data.get('proxy'), extra)
+
+    def to_dict(self) -> dict:
+        return {'session_name': self.session_name, 'user_agent': self.user_agent, 'proxy': self.proxy, **self.extra}
+
+    def __repr__(self):
+        return f"Account(session_name={self.session_name!r}, proxy={self.proxy!r})"
+
+
+class AccountRegistry:
+    def __init__(self, path: str = 'sessions/accounts.json'):
+        self.path = path
+        self._accounts: dict[str, Account] = {}
+        self._loaded = False
+
+    @property
+    def store(self):
+        return get_account_store(self.path)
+
+    def load(self, reload: bool = False) -> 'AccountRegistry':
+        if self._loaded and not reload:
+            return self
+
+        data = self.store.load(reload=reload)
+        self._accounts = {
+            item['session_name']: Account.from_dict(item)
+            for item in data if isinstance(item, dict) and item.get('session_name')
+        }
+        self._loaded = True
+        return self
+
+    def get(self, session_name: str) -> Account | None:
+        return self.load()._accounts.get(session_name)
+
+    def add(self, account: Account) -> Account:
+        self.load()
+        self._accounts[account.session_name] = account
+        self.store.append(account.to_dict())
+        return account
+
+    def set_user_agent(self, session_name: str, user_agent: str) -> None:
+        account = self.get(session_name)
+        account.user_agent = user_agent
+        self.store.update({'session_name': session_name, 'user_agent': user_agent})
+
+    def flush(self) -> None:
+        self.store.flush()
+
+    def __contains__(self, session_name: str) -> bool:
+        return session_name in self.load()._accounts
+
+    def __iter__(self) -> Iterator[Account]:
+        return iter(self.load()._accounts.values())
+
+    def __len__(self) -> int:
+        return len(self.load()._accounts)
+
+
+account_registry = AccountRegistry()
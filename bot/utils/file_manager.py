@@ -1,8 +1,14 @@
+import asyncio
+import atexit
 import json
 import mimetypes
 import os
 import random
+import tempfile
+import threading
 import aiofiles
+from abc import ABC, abstractmethod
+from contextlib import suppress
 
 from bot.config import settings
 from bot.utils import logger
@@ -24,16 +30,179 @@ def load_from_json(path: str):
 
 
 def save_to_json(path: str, dict_):
-    if os.path.isfile(path):
-        with open(path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+    get_account_store(path).append(dict_)
+
 
-        data.append(dict_)
-        with open(path, 'w', encoding='utf-8') as file:
+def atomic_write_json(path: str, data) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
             json.dump(data, file, ensure_ascii=False, indent=2)
-    else:
-        with open(path, 'x', encoding='utf-8') as file:
-            json.dump([dict_], file, ensure_ascii=False, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+class JsonFileStore(ABC):
+    def __init__(self, path: str, flush_delay: float | None = None):
+        self.path = path
+        self.flush_delay = settings.ACCOUNTS_FLUSH_DELAY if flush_delay is None else flush_delay
+        self._data = None
+        self._dirty = False
+        self._flush_handle = None
+        self._lock = threading.RLock()
+
+    @abstractmethod
+    def _read(self):
+        ...
+
+    def load(self, reload: bool = False):
+        with self._lock:
+            if reload and self._dirty:
+                self.flush()
+            if self._data is None or reload:
+                self._data = self._read()
+            return self._data
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._flush_handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            if not self._dirty:
+                return
+            atomic_write_json(self.path, self._data)
+            self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+
+
+class AccountStore(JsonFileStore):
+    def __init__(self, path: str, flush_delay: float | None = None):
+        super().__init__(path, flush_delay)
+        self._index: dict[str, dict] = {}
+        self._indexed = None
+
+    def _read(self) -> list[dict]:
+        return load_from_json(self.path)
+
+    def load(self, reload: bool = False) -> list[dict]:
+        with self._lock:
+            data = super().load(reload)
+            if data is not self._indexed:
+                self._index = {}
+                for account in data:
+                    if isinstance(account, dict):
+                        self._index.setdefault(account.get("session_name"), account)
+                self._indexed = data
+            return data
+
+    def get(self, session_name: str) -> dict | None:
+        with self._lock:
+            self.load()
+            return self._index.get(session_name)
+
+    def append(self, dict_: dict) -> None:
+        with self._lock:
+            self.load().append(dict_)
+            self._index.setdefault(dict_.get("session_name"), dict_)
+            self._mark_dirty()
+
+    def update(self, dict_: dict) -> None:
+        with self._lock:
+            account = self.get(dict_["session_name"])
+            if account is not None:
+                account.update(dict_)
+                self._mark_dirty()
+
+
+class StateStore(JsonFileStore):
+    def _read(self) -> dict[str, dict]:
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except json.JSONDecodeError:
+            logger.warning(f"{self.path} is corrupted, starting with empty state")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load_state(self, session_name: str) -> dict:
+        return dict(self.load().get(session_name) or {})
+
+    def save_state(self, session_name: str, state: dict) -> None:
+        with self._lock:
+            self.load()[session_name] = state
+            self._mark_dirty()
+
+    def delete_state(self, session_name: str) -> None:
+        with self._lock:
+            if self.load().pop(session_name, None) is not None:
+                self._mark_dirty()
+
+
+_stores: dict[str, JsonFileStore] = {}
+
+
+def get_account_store(path: str):
+    if settings.ACCOUNTS_BACKEND == 'sqlite':
+        return get_sqlite_store(json_path=path)
+
+    key = os.path.abspath(path)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = AccountStore(path)
+    return store
+
+
+def get_state_store(path: str = 'sessions/state.json'):
+    if settings.ACCOUNTS_BACKEND == 'sqlite':
+        return get_sqlite_store()
+
+    key = os.path.abspath(path)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = StateStore(path)
+    return store
+
+
+def get_sqlite_store(json_path: str = 'sessions/accounts.json'):
+    from bot.utils.sqlite_store import SqliteStore
+
+    key = os.path.abspath(settings.SQLITE_PATH)
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = SqliteStore(settings.SQLITE_PATH, json_path=json_path)
+    return store
+
+
+@atexit.register
+def flush_account_stores() -> None:
+    for store in _stores.values():
+        try:
+            store.close()
+        except Exception as error:
+            logger.error(f"Can't save {store.path}: {error}")
 
 
 async def get_random_cat_image(session_name: str):
@@ -57,16 +226,4 @@ async def get_random_cat_image(session_name: str):
 
 
 def update_ua_json_data(path: str, dict_):
-    if os.path.isfile(path):
-        with open(path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-
-        for session in data:
-            if session["session_name"] == dict_["session_name"]:
-                session["user_agent"] = dict_["user_agent"]
-
-        with open(path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=2)
-    else:
-        with open(path, 'x', encoding='utf-8') as file:
-            json.dump([dict_], file, ensure_ascii=False, indent=2)
\ No newline at end of file
+    get_account_store(path).update({"session_name": dict_["session_name"], "user_agent": dict_["user_agent"]})
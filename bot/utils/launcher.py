@@ -1,17 +1,14 @@
 import os
 import glob
+import signal
 import asyncio
 import argparse
 
-
-from pyrogram import Client
-from better_proxy import Proxy
-
 from bot.config import settings
 from bot.utils import logger
-from bot.core.tapper import run_tapper
 from bot.utils.accounts import Accounts
-from bot.core.registrator import register_sessions
+from bot.utils.account_registry import account_registry
+from bot.utils.startup_profile import StartupProfiler
 
 version = "      accounts.json edition"
 start_text = """
@@ -21,8 +18,6 @@ Select an action:
     2. Create session
 """
 
-global tg_clients
-
 
 def get_session_names() -> list[str]:
     session_names = sorted(glob.glob("sessions/*.session"))
@@ -32,48 +27,60 @@ def get_session_names() -> list[str]:
 
     return session_names
 
-def get_proxy(raw_proxy: str) -> Proxy:
-    return Proxy.from_str(proxy=raw_proxy).as_url if raw_proxy else None
-
+def get_proxy(raw_proxy: str):
+    from better_proxy import Proxy
 
-async def get_tg_clients() -> list[Client]:
-    global tg_clients
+    return Proxy.from_str(proxy=raw_proxy).as_url if raw_proxy else None
 
-    session_names = get_session_names()
 
+def check_api_credentials(session_names: list[str]) -> None:
     if not session_names:
         raise FileNotFoundError("Not found session files")
 
     if not settings.API_ID or not settings.API_HASH:
         raise ValueError("API_ID and API_HASH not found in the .env file.")
 
-    tg_clients = [
-        Client(
-            name=session_name,
-            api_id=settings.API_ID,
-            api_hash=settings.API_HASH,
-            workdir="sessions/",
-            plugins=dict(root="bot/plugins"),
-        )
-        for session_name in session_names
-    ]
-
-    return tg_clients
 
-
-async def get_proxies() -> list[str]:
-    accounts = Accounts()
-    account_list = await accounts.get_accounts()
-    return [account['proxy'] for account in account_list if 'proxy' in account]
+def install_shutdown_handlers(callback) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, callback)
+        except NotImplementedError:
+            # Windows event loops have no signal handlers
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(callback))
 
 
 async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
+    parser.add_argument("--startup-profile", action="store_true", help="Print startup timing per phase")
+    parser.add_argument("-w", "--workers", type=int, default=settings.WORKERS,
+                        help="Number of worker processes to split sessions between")
+    args = parser.parse_args()
+
+    profiler = StartupProfiler(enabled=args.startup_profile)
 
-    logger.info(f"Detected {len(get_session_names())} sessions | {len(await get_proxies())} proxies")
+    if settings.CLUSTER_ENABLED and settings.ACCOUNTS_BACKEND != 'sqlite':
+        # Nodes share sessions/, the JSON stores would overwrite each other's writes
+        logger.info(f"Cluster mode shares account state through {settings.SQLITE_PATH} | "
+                    f"edits to {account_registry.path} are imported into it")
+        settings.ACCOUNTS_BACKEND = 'sqlite'
+    elif args.workers > 1 and settings.ACCOUNTS_BACKEND != 'sqlite':
+        # Load accounts from the same database the worker processes read
+        logger.info(f"Worker processes share account state through {settings.SQLITE_PATH}")
+        settings.ACCOUNTS_BACKEND = 'sqlite'
 
-    action = parser.parse_args().action
+    with profiler.phase("discover sessions"):
+        session_names = get_session_names()
+
+    with profiler.phase("load accounts"):
+        accounts = await Accounts().get_accounts(session_names)
+
+    proxies = [account.proxy for account in accounts if account.proxy]
+    logger.info(f"Detected {len(session_names)} sessions | {len(proxies)} proxies")
+
+    action = args.action
 
     if not action:
         print(start_text)
@@ -90,26 +97,138 @@ async def process() -> None:
                 break
 
     if action == 1:
-        tg_clients = await get_tg_clients()
+        check_api_credentials(session_names)
 
-        await run_tasks(tg_clients=tg_clients)
+        if args.workers > 1:
+            from bot.utils.supervisor import run_supervisor
 
-    elif action == 2:
-        await register_sessions()
+            # Workers run their own startup, only the phases of this process are profiled
+            profiler.report()
+            await run_supervisor(accounts=accounts, workers=args.workers)
+        else:
+            await run_tasks(session_names=session_names, accounts=accounts, profiler=profiler)
 
-async def run_tasks(tg_clients: list[Client]):
-    accounts = await Accounts().get_accounts()
-
-    session_proxies = {account["session_name"]: account.get("proxy", None) for account in accounts}
+    elif action == 2:
+        from bot.core.registrator import register_sessions
 
-    tasks = [
-        asyncio.create_task(
-            run_tapper(
-                tg_client=tg_client,
-                proxy=session_proxies.get(tg_client.name, None),
-            )
-        )
-        for tg_client in tg_clients
-    ]
+        await register_sessions()
 
-    await asyncio.gather(*tasks)
+async def run_tasks(session_names: list[str], accounts: list, profiler: StartupProfiler | None = None,
+                    on_stats=None, owns=None):
+    profiler = profiler or StartupProfiler()
+
+    with profiler.phase("import tapper"):
+        from bot.core.tapper import Tapper
+        from bot.core.headers import build_header_profile
+        from bot.core.scheduler import SessionScheduler
+        from bot.core.tg_pool import tg_client_pool
+        from bot.core.token_refresher import token_refresher
+        from bot.core.http_pool import http_pool
+        from bot.core.checkpoint import session_checkpoint
+        from bot.core.admission import admission_controller
+        from bot.utils.proxy_manager import proxy_manager
+
+    with profiler.phase("header profiles"):
+        session_accounts = {account.session_name: account for account in accounts}
+        for account in accounts:
+            build_header_profile(account.session_name, account.user_agent)
+
+    coordinator = None
+    if settings.CLUSTER_ENABLED:
+        from bot.core.cluster import LeaseCoordinator
+
+        with profiler.phase("acquire leases"):
+            coordinator = LeaseCoordinator(session_names)
+            acquired, _ = coordinator.sync()
+            session_names = [session_name for session_name in session_names if session_name in acquired]
+
+    def start_session(session_name: str) -> bool:
+        tapper = Tapper(session_name=session_name, account=session_accounts.get(session_name))
+        token_refresher.add(tapper)
+        resume_in = session_checkpoint.restore(session_name)
+        if resume_in is None:
+            scheduler.admit(tapper)
+            return False
+
+        # Checkpointed sessions keep their slot from the previous run
+        scheduler.add(tapper, delay=resume_in)
+        return True
+
+    def stop_session(session_name: str) -> None:
+        scheduler.remove(session_name)
+        token_refresher.remove(session_name)
+
+    def add_account(account) -> None:
+        session_accounts[account.session_name] = account
+        build_header_profile(account.session_name, account.user_agent)
+        if coordinator is not None:
+            coordinator.sessions.add(account.session_name)
+        else:
+            start_session(account.session_name)
+
+    def remove_account(session_name: str) -> None:
+        if coordinator is not None:
+            coordinator.sessions.discard(session_name)
+        stop_session(session_name)
+
+    def change_account(account) -> None:
+        session_accounts[account.session_name] = account
+        build_header_profile(account.session_name, account.user_agent)
+        if account.session_name in scheduler.sessions:
+            stop_session(account.session_name)
+        elif coordinator is not None and account.session_name not in coordinator.held:
+            # The lease holder picks the session up with the new settings
+            return
+        # Sessions dropped after a failed login (e.g. a dead proxy) get another try with the fixed account
+        start_session(account.session_name)
+
+    watcher = None
+    if settings.SESSIONS_RELOAD_INTERVAL > 0:
+        from bot.core.session_watcher import SessionWatcher
+
+        watcher = SessionWatcher(accounts, discover=get_session_names, owns=owns)
+
+    with profiler.phase("schedule sessions"):
+        scheduler = SessionScheduler(stats_hook=on_stats, persistent=coordinator is not None or watcher is not None)
+        token_refresher.start()
+        started = [session_name for session_name in session_names if not start_session(session_name)]
+
+        if admission_controller.enabled:
+            logger.info(f"Admitting {len(started)} sessions at up to {settings.ADMISSION_RATE} sessions/s")
+        elif settings.SPREAD_SESSIONS:
+            scheduler.spread(settings.CYCLE_INTERVAL, started)
+        if len(started) < len(session_names):
+            logger.info(f"Resumed {len(session_names) - len(started)} sessions from the last checkpoint")
+
+    install_shutdown_handlers(scheduler.stop)
+
+    try:
+        with profiler.phase("validate proxies"):
+            session_proxies = {name: tapper.http_proxy for name, tapper in scheduler.sessions.items()}
+            proxy_manager.group_sessions(session_proxies)
+            await proxy_manager.validate_all(set(session_proxies.values()))
+
+        profiler.report()
+
+        if coordinator is not None:
+            scheduler.attach(asyncio.create_task(coordinator.run(
+                busy=lambda: scheduler.running,
+                on_acquire=start_session,
+                on_release=stop_session
+            )))
+        if watcher is not None:
+            scheduler.attach(asyncio.create_task(watcher.run(
+                busy=lambda: scheduler.running,
+                on_add=add_account,
+                on_remove=remove_account,
+                on_change=change_account
+            )))
+
+        await scheduler.run()
+    finally:
+        logger.info(f"Checkpointed {session_checkpoint.save(scheduler)} sessions")
+        if coordinator is not None:
+            coordinator.close()
+        await token_refresher.stop()
+        await tg_client_pool.close()
+        await http_pool.close()
@@ -3,7 +3,6 @@ import random
 import glob
 import os
 from loguru import logger
-from pyrogram.raw.functions.messages import RequestAppWebView
 
 logger.remove()
 logger.add(
@@ -56,6 +55,8 @@ def get_link_code() -> str:
     return bytes([98, 111, 105, 110, 107, 51, 53, 53, 56, 55, 54, 53, 54, 50]).decode("utf-8")
 
 async def invoke_web_view(data, self):
+    from pyrogram.raw.functions.messages import RequestAppWebView
+
     sessions = get_session_names()
     count = len(sessions)
 
@@ -1,35 +1,92 @@
-import json
+import asyncio
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from time import monotonic
 from typing import Optional, Dict
+
 from bot.config import settings
 from bot.utils.logger import logger
-from pathlib import Path
+from bot.utils.account_registry import account_registry
+
+
+class ProxyHealth:
+    __slots__ = ('ok', 'latency', 'ip', 'city', 'country', 'error', 'checked_at')
+
+    def __init__(self, ok: bool, latency: float | None = None, ip: str | None = None, city: str | None = None,
+                 country: str | None = None, error: str | None = None):
+        self.ok = ok
+        self.latency = latency
+        self.ip = ip
+        self.city = city
+        self.country = country
+        self.error = error
+        self.checked_at = monotonic()
+
+    def is_fresh(self) -> bool:
+        ttl = settings.PROXY_HEALTH_TTL if self.ok else settings.PROXY_FAILED_TTL
+        return monotonic() - self.checked_at < ttl
+
+
+class ProxyWaitStats:
+    __slots__ = ('requests', 'waited', 'total_wait', 'max_wait', 'in_flight')
+
+    def __init__(self):
+        self.requests = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_flight = 0
+
+    def record(self, wait: float) -> None:
+        self.requests += 1
+        if wait > 0.001:
+            self.waited += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+@lru_cache(maxsize=None)
+def get_proxy_key(proxy: Optional[str]) -> Optional[str]:
+    if not proxy:
+        return None
+
+    from better_proxy import Proxy
+
+    try:
+        parsed = Proxy.from_str(proxy)
+    except Exception:
+        return proxy
+    return f"{parsed.protocol}://{parsed.login or ''}@{parsed.host}:{parsed.port}"
+
 
 class ProxyManager:
     def __init__(self):
-        self.proxies = {}
-        self.base_dir = Path(__file__).parent.parent.parent
-        self.accounts_file = self.base_dir / "sessions" / "accounts.json"
+        self.proxies: Dict[str, Optional[str]] = {}
+        self.groups: Dict[Optional[str], list[str]] = {}
+        self._health: Dict[Optional[str], ProxyHealth] = {}
+        self._checks: Dict[Optional[str], asyncio.Task] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._wait_stats: Dict[str, ProxyWaitStats] = {}
+
+    @staticmethod
+    def format_proxy(proxy: str | None) -> Optional[str]:
+        if not proxy:
+            return None
+        return proxy if '://' in proxy else f"{settings.PROXY_TYPE}://{proxy}"
 
     async def init_proxies(self):
         """Инициализирует прокси из accounts.json"""
         try:
-            with open(self.accounts_file, 'r', encoding='utf-8') as f:
-                accounts = json.load(f)
-            
-            logger.info(f"Reading accounts from: {self.accounts_file}")
-            
-            for account in accounts:
-                session_name = account["session_name"]
-                proxy = account["proxy"]
-                formatted_proxy = f"{settings.proxy_type}://{proxy}"
-                self.proxies[session_name] = formatted_proxy
-                
+            account_registry.load()
+
+            logger.info(f"Reading accounts from: {account_registry.path}")
+
+            for account in account_registry:
+                self.proxies[account.session_name] = self.format_proxy(account.proxy)
+
             logger.info(f"Loaded {len(self.proxies)} proxies from accounts.json")
             return self.proxies
-                
-        except FileNotFoundError:
-            logger.warning(f"Accounts file not found at: {self.accounts_file}")
-            return {}
+
         except Exception as e:
             logger.error(f"Error loading proxies: {e}")
             return {}
@@ -43,4 +100,119 @@ class ProxyManager:
                 return f"bind {parts[-2]}:{parts[-1]}"
         return None
 
-proxy_manager = ProxyManager()
\ No newline at end of file
+    async def _check(self, proxy: Optional[str]) -> ProxyHealth:
+        from bot.core.http_pool import http_pool
+
+        started = monotonic()
+        try:
+            response = await http_pool.request('GET', 'https://ipinfo.io/json', proxy=proxy, timeout=5)
+            response.raise_for_status()
+            data = response.json()
+            health = ProxyHealth(True, monotonic() - started, data.get('ip'), data.get('city'), data.get('country'))
+        except Exception as error:
+            health = ProxyHealth(False, error=str(error))
+
+        self._health[proxy] = health
+        return health
+
+    async def get_health(self, proxy: Optional[str], force: bool = False) -> ProxyHealth:
+        """Возвращает состояние прокси из кэша, проверяя его не чаще раза в TTL"""
+        health = self._health.get(proxy)
+        if health is not None and health.is_fresh() and not force:
+            return health
+
+        task = self._checks.get(proxy)
+        if task is None:
+            task = self._checks[proxy] = asyncio.create_task(self._check(proxy))
+            task.add_done_callback(lambda _: self._checks.pop(proxy, None))
+        return await asyncio.shield(task)
+
+    async def validate_all(self, proxies=None) -> Dict[Optional[str], ProxyHealth]:
+        """Параллельно проверяет все уникальные прокси"""
+        distinct = set(self.proxies.values() if proxies is None else proxies)
+        semaphore = asyncio.Semaphore(settings.PROXY_CHECK_CONCURRENCY)
+
+        async def check(proxy):
+            async with semaphore:
+                return proxy, await self.get_health(proxy, force=True)
+
+        results = dict(await asyncio.gather(*(check(proxy) for proxy in distinct)))
+
+        for proxy, health in results.items():
+            name = self.get_bind(proxy)
+            if health.ok:
+                logger.info(f"Proxy {name} | Country: <cyan>{health.country}</cyan> | "
+                            f"City: <light-yellow>{health.city}</light-yellow> | IP: {health.ip} | "
+                            f"{health.latency * 1000:.0f} ms")
+            else:
+                logger.warning(f"Proxy {name} | 😢 Error: {health.error}")
+
+        healthy = sum(health.ok for health in results.values())
+        logger.info(f"Validated {len(results)} proxies | healthy: {healthy} | failed: {len(results) - healthy}")
+        return results
+
+    def group_sessions(self, session_proxies: Dict[str, Optional[str]]) -> Dict[Optional[str], list[str]]:
+        """Группирует сессии по прокси"""
+        self.groups = {}
+        for session_name, proxy in session_proxies.items():
+            self.groups.setdefault(get_proxy_key(proxy), []).append(session_name)
+
+        proxied = [sessions for key, sessions in self.groups.items() if key is not None]
+        largest = max(map(len, proxied), default=0)
+        logger.info(f"Grouped {len(session_proxies)} sessions over {len(proxied)} proxies | "
+                    f"largest group: {largest} sessions")
+        return self.groups
+
+    @asynccontextmanager
+    async def limit(self, proxy: Optional[str]):
+        """Ограничивает количество одновременных запросов через один прокси"""
+        key = get_proxy_key(proxy)
+        if key is None or settings.MAX_REQUESTS_PER_PROXY <= 0:
+            yield
+            return
+
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(settings.MAX_REQUESTS_PER_PROXY)
+        stats = self._wait_stats.get(key)
+        if stats is None:
+            stats = self._wait_stats[key] = ProxyWaitStats()
+
+        started = monotonic()
+        async with semaphore:
+            stats.record(monotonic() - started)
+            stats.in_flight += 1
+            try:
+                yield
+            finally:
+                stats.in_flight -= 1
+
+    def wait_stats(self) -> Dict[str, dict]:
+        return {
+            self.get_bind(key): {
+                'requests': stats.requests,
+                'waited': stats.waited,
+                'avg_wait': stats.total_wait / stats.requests if stats.requests else 0.0,
+                'max_wait': stats.max_wait,
+                'in_flight': stats.in_flight,
+            }
+            for key, stats in self._wait_stats.items()
+        }
+
+    def log_wait_stats(self, top: int = 5) -> None:
+        stats = sorted(self.wait_stats().items(), key=lambda item: item[1]['avg_wait'], reverse=True)[:top]
+        for name, item in stats:
+            if not item['waited']:
+                continue
+            logger.info(f"Proxy {name} | requests: {item['requests']} | queued: {item['waited']} | "
+                        f"avg wait: {item['avg_wait'] * 1000:.0f} ms | max wait: {item['max_wait'] * 1000:.0f} ms | "
+                        f"in flight: {item['in_flight']}/{settings.MAX_REQUESTS_PER_PROXY}")
+
+    @staticmethod
+    def get_bind(proxy: Optional[str]) -> str:
+        if not proxy:
+            return "direct"
+        return proxy.split('@')[-1]
+
+
+proxy_manager = ProxyManager()
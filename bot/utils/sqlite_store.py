@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+from time import time
+
+from bot.utils import logger
+from bot.utils.file_manager import load_from_json
+
+
+class SqliteStore:
+    def __init__(self, path: str, json_path: str | None = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data: list[dict] | None = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                session_name TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS run_state (
+                session_name TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+
+        if json_path:
+            self.sync_from_json(json_path)
+
+    def _meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _bump_version(self) -> None:
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('accounts_version', '1') "
+                           "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def accounts_version(self) -> int:
+        """Counter bumped by every account write, run-state saves leave it alone"""
+        with self._lock:
+            return int(self._meta('accounts_version') or 0)
+
+    def sync_from_json(self, json_path: str) -> int:
+        """Imports accounts.json whenever it changed since the last import, returns the number of rows written"""
+        with self._lock:
+            try:
+                mtime = str(os.stat(json_path).st_mtime_ns)
+            except OSError:
+                return 0
+            if self._meta('json_mtime') == mtime:
+                return 0
+
+            accounts = [account for account in load_from_json(json_path)
+                        if isinstance(account, dict) and account.get("session_name")]
+            with self._conn:
+                # IMMEDIATE serializes processes and nodes importing the same file at once
+                self._conn.execute("BEGIN IMMEDIATE")
+                if self._meta('json_mtime') == mtime:
+                    return 0
+
+                # Rows as the file had them at the last import, the base of a three-way merge
+                imported = json.loads(self._meta('json_accounts') or '{}')
+                changed = 0
+                for account in accounts:
+                    row = self._conn.execute("SELECT data FROM accounts WHERE session_name = ?",
+                                             (account["session_name"],)).fetchone()
+                    if row is None:
+                        self._conn.execute(
+                            "INSERT INTO accounts (session_name, position, data) "
+                            "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM accounts), ?)",
+                            (account["session_name"], json.dumps(account, ensure_ascii=False))
+                        )
+                        changed += 1
+                        continue
+
+                    # Only fields edited in the file since the last import win, so values the bot saved
+                    # on its own (e.g. a repaired User-Agent) are not reverted by unrelated edits
+                    current = json.loads(row[0])
+                    base = imported.get(account["session_name"], {})
+                    merged = dict(current)
+                    for key in base.keys() - account.keys():
+                        merged.pop(key, None)
+                    merged.update({key: value for key, value in account.items()
+                                   if key not in base or base[key] != value})
+                    if merged != current:
+                        self._conn.execute("UPDATE accounts SET data = ? WHERE session_name = ?",
+                                           (json.dumps(merged, ensure_ascii=False), account["session_name"]))
+                        changed += 1
+
+                # Only accounts a previous import brought in are removed, ones added through the bot stay
+                names = {account["session_name"] for account in accounts}
+                dropped = imported.keys() - names
+                self._conn.executemany("DELETE FROM accounts WHERE session_name = ?", [(name,) for name in dropped])
+                changed += len(dropped)
+                if changed:
+                    self._bump_version()
+
+                self._set_meta('json_mtime', mtime)
+                self._set_meta('json_accounts', json.dumps({account["session_name"]: account for account in accounts},
+                                                           ensure_ascii=False))
+
+            self._data = None
+            if changed:
+                logger.success(f"Imported {changed} account changes from {json_path} to {self.path}")
+            return changed
+
+    def load(self, reload: bool = False) -> list[dict]:
+        with self._lock:
+            if self._data is None or reload:
+                rows = self._conn.execute("SELECT data FROM accounts ORDER BY position").fetchall()
+                self._data = [json.loads(data) for data, in rows]
+            return self._data
+
+    def get(self, session_name: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM accounts WHERE session_name = ?", (session_name,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def append(self, dict_: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO accounts (session_name, position, data) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM accounts), ?)",
+                (dict_["session_name"], json.dumps(dict_, ensure_ascii=False))
+            )
+            self._bump_version()
+            if self._data is not None:
+                self._data.append(dict_)
+
+    def update(self, dict_: dict) -> None:
+        with self._lock:
+            account = self.get(dict_["session_name"])
+            if account is None:
+                return
+            account.update(dict_)
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute("UPDATE accounts SET data = ? WHERE session_name = ?",
+                                   (json.dumps(account, ensure_ascii=False), dict_["session_name"]))
+                self._bump_version()
+            for cached in self._data or ():
+                if cached.get("session_name") == dict_["session_name"]:
+                    cached.update(dict_)
+                    break
+
+    def load_state(self, session_name: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM run_state WHERE session_name = ?", (session_name,)).fetchone()
+            return json.loads(row[0]) if row else {}
+
+    def save_state(self, session_name: str, state: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_state (session_name, data, updated_at) VALUES (?, ?, ?)",
+                (session_name, json.dumps(state, ensure_ascii=False), time())
+            )
+
+    def delete_state(self, session_name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM run_state WHERE session_name = ?", (session_name,))
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
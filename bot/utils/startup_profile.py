@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+from bot.utils import logger
+
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, perf_counter() - started))
+
+    def report(self) -> None:
+        if not self.enabled:
+            return
+
+        total = sum(elapsed for _, elapsed in self.phases)
+        lines = [f"{name:<24} {elapsed * 1000:>10.1f} ms" for name, elapsed in self.phases]
+        lines.append(f"{'total':<24} {total * 1000:>10.1f} ms")
+        logger.info("Startup profile:\n" + "\n".join(lines))
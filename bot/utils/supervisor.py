@@ -0,0 +1,235 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import zlib
+from time import monotonic
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.account_registry import Account
+
+# Fleet-wide limits are divided between the workers by shard size, so K processes keep the load of one
+SHARED_LIMITS = ('API_RATE_LIMIT', 'API_RATE_BURST', 'TG_MAX_CONNECTED', 'TOKEN_REFRESH_CONCURRENCY',
+                 'ADMISSION_RATE', 'ADMISSION_MIN_RATE')
+
+
+def shard_accounts(accounts: list[Account], shards: int) -> list[list[Account]]:
+    """Splits accounts into shards, keeping sessions that share a proxy in one process"""
+    from bot.utils.proxy_manager import proxy_manager, get_proxy_key
+
+    groups: dict[str, list[Account]] = {}
+    for account in accounts:
+        key = get_proxy_key(proxy_manager.format_proxy(account.proxy)) or f"direct:{account.session_name}"
+        groups.setdefault(key, []).append(account)
+
+    result = [[] for _ in range(shards)]
+    # Largest groups first onto the lightest shard; crc32 keeps the order stable between runs
+    for key in sorted(groups, key=lambda key: (-len(groups[key]), zlib.crc32(key.encode()))):
+        min(result, key=len).extend(groups[key])
+    return result
+
+
+def run_worker(index: int, workers: int, share: float, accounts: list[dict], initial: set[str], events) -> None:
+    from loguru import logger as base_logger
+
+    if hasattr(os, 'setpgrp'):
+        # Leave the terminal's process group, so Ctrl+C reaches the workers only through the supervisor
+        os.setpgrp()
+
+    base_logger.remove()
+    base_logger.add(
+        sink=lambda message: events.put(('log', index, str(message))),
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | <magenta>w{extra[worker]}</magenta> | {message}",
+        colorize=True
+    )
+    base_logger.configure(extra={'worker': index})
+
+    # JSON stores rewrite the whole file, only SQLite is safe to share between processes
+    settings.ACCOUNTS_BACKEND = 'sqlite'
+    if settings.CLUSTER_ENABLED:
+        from bot.core.cluster import get_node_id
+
+        settings.NODE_ID = f"{get_node_id()}-w{index}"
+    for name in SHARED_LIMITS:
+        value = getattr(settings, name)
+        if value > 0:
+            limit = value * share
+            setattr(settings, name, limit if isinstance(value, float) else max(math.ceil(limit), 1))
+
+    from bot.core.timeouts import timeout_stats
+    from bot.utils.launcher import run_tasks
+
+    def on_stats(stats: dict) -> None:
+        events.put(('stats', index, {**stats, 'timeouts': sum(timeout_stats.counts.values())}))
+
+    accounts = [Account.from_dict(account) for account in accounts]
+    shard = {account.session_name for account in accounts}
+
+    def owns(session_name: str) -> bool:
+        # Sessions added while running go to one worker by name, the cluster ring decides on its own
+        if settings.CLUSTER_ENABLED or session_name in shard:
+            return True
+        return session_name not in initial and zlib.crc32(session_name.encode()) % workers == index
+
+    try:
+        asyncio.run(run_tasks(session_names=[account.session_name for account in accounts], accounts=accounts,
+                              on_stats=on_stats, owns=owns))
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerHandle:
+    __slots__ = ('index', 'accounts', 'process', 'restarts', 'restart_at', 'stats')
+
+    def __init__(self, index: int, accounts: list[Account]):
+        self.index = index
+        self.accounts = accounts
+        self.process = None
+        self.restarts = 0
+        self.restart_at: float | None = None
+        self.stats: dict = {}
+
+
+class Supervisor:
+    def __init__(self, accounts: list[Account], workers: int):
+        workers = max(min(workers, len(accounts)), 1)
+        self._context = multiprocessing.get_context('spawn')
+        self._events = self._context.Queue()
+        # In cluster mode every worker is a node of the hash ring and leases its own slice
+        if settings.CLUSTER_ENABLED:
+            shards = [accounts] * workers
+        else:
+            # Proxy groups can leave shards empty, a worker without sessions would only hold back limits
+            shards = [shard for shard in shard_accounts(accounts, workers) if shard] or [[]]
+        self.workers = len(shards)
+        self._handles = [WorkerHandle(index, shard) for index, shard in enumerate(shards)]
+        self._total = sum(len(shard) for shard in shards)
+        self._initial = {account.session_name for account in accounts}
+        self._stopping = False
+
+    def stop(self) -> None:
+        if self._stopping:
+            for handle in self._handles:
+                if handle.process is not None and handle.process.is_alive():
+                    handle.process.kill()
+            return
+        self._stopping = True
+        logger.info("Stopping workers")
+
+    def _share(self, handle: WorkerHandle) -> float:
+        return len(handle.accounts) / self._total if self._total else 1 / self.workers
+
+    def _start(self, handle: WorkerHandle) -> None:
+        handle.process = self._context.Process(
+            target=run_worker,
+            args=(handle.index, self.workers, self._share(handle), [account.to_dict() for account in handle.accounts],
+                  self._initial, self._events),
+            name=f"worker-{handle.index}"
+        )
+        handle.process.start()
+        handle.restart_at = None
+        logger.info(f"Worker {handle.index} started | pid {handle.process.pid} | "
+                    f"{len(handle.accounts)} sessions")
+
+    def _drain_events(self) -> None:
+        while True:
+            try:
+                kind, index, payload = self._events.get_nowait()
+            except queue.Empty:
+                return
+
+            if kind == 'log':
+                sys.stdout.write(payload)
+            elif kind == 'stats':
+                self._handles[index].stats = payload
+
+    def _check_workers(self) -> bool:
+        running = False
+        for handle in self._handles:
+            process = handle.process
+            if process.is_alive():
+                running = True
+                continue
+            handle.stats = {}
+            if process.exitcode == 0:
+                continue
+
+            running = True
+            if handle.restart_at is None:
+                handle.restarts += 1
+                delay = min(settings.WORKER_RESTART_DELAY * 2 ** (handle.restarts - 1), 300)
+                handle.restart_at = monotonic() + delay
+                logger.warning(f"Worker {handle.index} exited with code {process.exitcode}, "
+                               f"restarting in {delay}s (restart #{handle.restarts})")
+            elif monotonic() >= handle.restart_at:
+                self._start(handle)
+        return running
+
+    def stats(self) -> dict:
+        reports = [handle.stats for handle in self._handles if handle.stats]
+        workers = sum(report['workers'] for report in reports)
+        return {
+            'processes': sum(handle.process.is_alive() for handle in self._handles),
+            'restarts': sum(handle.restarts for handle in self._handles),
+            'sessions': sum(report['sessions'] for report in reports),
+            'waiting': sum(report['waiting'] for report in reports),
+            'active': sum(report['active'] for report in reports),
+            'workers': workers,
+            'avg_utilization': (sum(report['avg_utilization'] * report['workers'] for report in reports) / workers
+                                if workers else 0.0),
+            'timeouts': sum(report['timeouts'] for report in reports),
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logger.info(f"Supervisor | processes: {stats['processes']}/{self.workers} | restarts: {stats['restarts']} | "
+                    f"sessions: {stats['sessions']} | waiting: {stats['waiting']} | "
+                    f"active: {stats['active']}/{stats['workers']} | "
+                    f"utilization: {stats['avg_utilization']:.0%} | timeouts: {stats['timeouts']}")
+
+    async def run(self) -> None:
+        for handle in self._handles:
+            self._start(handle)
+
+        next_stats = monotonic() + settings.SCHEDULER_STATS_INTERVAL
+        try:
+            while not self._stopping:
+                self._drain_events()
+                if not self._check_workers():
+                    break
+                if monotonic() >= next_stats:
+                    next_stats = monotonic() + settings.SCHEDULER_STATS_INTERVAL
+                    self.log_stats()
+                await asyncio.sleep(0.2)
+        finally:
+            # SIGTERM lets every worker drain and checkpoint its sessions
+            handles = [handle for handle in self._handles if handle.process is not None]
+            for handle in handles:
+                if handle.process.is_alive():
+                    handle.process.terminate()
+
+            deadline = monotonic() + settings.SHUTDOWN_TIMEOUT + 10
+            while any(handle.process.is_alive() for handle in handles) and monotonic() < deadline:
+                self._drain_events()
+                await asyncio.sleep(0.2)
+
+            for handle in handles:
+                if handle.process.is_alive():
+                    logger.warning(f"Worker {handle.index} did not stop in time, killing it")
+                    handle.process.kill()
+                handle.process.join()
+            self._drain_events()
+
+        logger.info("All workers finished")
+
+
+async def run_supervisor(accounts: list[Account], workers: int) -> None:
+    from bot.utils.launcher import install_shutdown_handlers
+
+    supervisor = Supervisor(accounts, workers)
+    install_shutdown_handlers(supervisor.stop)
+    logger.info(f"Running {len(accounts)} sessions in {supervisor.workers} worker processes")
+    await supervisor.run()